@@ -0,0 +1,169 @@
+# Dependencies
+import datetime
+import os
+import threading
+
+import pandas as pd
+import numpy as np
+
+from calories import window_calories, WINDOW_SECONDS
+from user_store import get_connection
+
+
+# SQLite file of the activity rollups, next to the users database
+ACTIVITY_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'activity.db')
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+def create_activity_tables(db_path=ACTIVITY_DB_PATH):
+    """Create the rollup table, one row per user, day and activity, and the table of windows
+    already recorded per user and source. Runs once per process and database. The rollups hold
+    windows and seconds only, calories depend on the weight and are computed when reading.
+
+    Args:
+        db_path (str, optional): SQLite file. Defaults to `ACTIVITY_DB_PATH`.
+    """
+    if db_path in _initialized:
+        return
+
+    with _init_lock:
+        if db_path in _initialized:
+            return
+
+        conn = get_connection(db_path)
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS activity_rollup('
+                         'username TEXT, day TEXT, activity TEXT, '
+                         'windows INTEGER, seconds REAL, '
+                         'PRIMARY KEY(username, day, activity)) WITHOUT ROWID')
+            conn.execute('CREATE TABLE IF NOT EXISTS activity_sources('
+                         'username TEXT, source TEXT, windows INTEGER, '
+                         'PRIMARY KEY(username, source)) WITHOUT ROWID')
+
+        _initialized.add(db_path)
+
+
+def recorded_windows(username, source, db_path=ACTIVITY_DB_PATH):
+    """Number of windows of `source` already recorded for `username`
+
+    Args:
+        username (str): Name of the user
+        source (str): Identifier of the stream of windows, e.g. the CSV path
+        db_path (str, optional): SQLite file. Defaults to `ACTIVITY_DB_PATH`.
+
+    Returns:
+        int: Windows recorded, new windows start at this position
+    """
+    create_activity_tables(db_path)
+    row = get_connection(db_path).execute(
+        'SELECT windows FROM activity_sources WHERE username = ? AND source = ?',
+        (username, source)).fetchone()
+
+    return row[0] if row else 0
+
+
+def record_windows(username, activities, days=None, durations=WINDOW_SECONDS, source=None,
+                   db_path=ACTIVITY_DB_PATH):
+    """Add predicted windows to the rollups of `username`. The windows are aggregated per day
+    and activity in memory and each group updates a single row, in one transaction.
+
+    With a `source`, `activities` holds all the windows of that source from the first one:
+    windows already recorded (see `recorded_windows`) are skipped, so replaying a source
+    does not count it twice.
+
+    Args:
+        username (str): Name of the user
+        activities (array-like): Predicted activity per window
+        days (str, date or array-like, optional): Day of every window (or of all of them). Defaults to today.
+        durations (float or array-like, optional): Duration of the windows in seconds. Defaults to `WINDOW_SECONDS`.
+        source (str, optional): Identifier of the stream of windows. Defaults to None.
+        db_path (str, optional): SQLite file. Defaults to `ACTIVITY_DB_PATH`.
+
+    Returns:
+        int: Number of windows added
+    """
+    create_activity_tables(db_path)
+    activities = np.asarray(activities)
+    if days is None:
+        days = datetime.date.today()
+
+    windows = pd.DataFrame({'activity': activities,
+                            'day': pd.to_datetime(np.broadcast_to(np.asarray(days), activities.shape)).strftime('%Y-%m-%d'),
+                            'seconds': np.broadcast_to(np.asarray(durations, dtype=float), activities.shape)})
+
+    conn = get_connection(db_path)
+    with conn:
+        if source is not None:
+            # read and move the position in the same write transaction
+            conn.execute('BEGIN IMMEDIATE')
+            start = recorded_windows(username, source, db_path)
+            windows = windows.iloc[start:]
+            conn.execute('INSERT INTO activity_sources(username, source, windows) VALUES(?,?,?) '
+                         'ON CONFLICT(username, source) DO UPDATE SET windows = excluded.windows',
+                         (username, source, max(start, len(activities))))
+
+        if windows.empty:
+            return 0
+
+        rollup = windows.groupby(['day', 'activity'], sort=False).agg(
+            windows=('seconds', 'size'), seconds=('seconds', 'sum'))
+
+        conn.executemany(
+            'INSERT INTO activity_rollup(username, day, activity, windows, seconds) VALUES(?,?,?,?,?) '
+            'ON CONFLICT(username, day, activity) DO UPDATE SET '
+            'windows = windows + excluded.windows, seconds = seconds + excluded.seconds',
+            [(username, day, str(activity), int(n), float(s))
+             for (day, activity), n, s in zip(rollup.index, rollup['windows'], rollup['seconds'])])
+
+    return len(windows)
+
+
+def daily_activity(username, weight=None, start=None, end=None, db_path=ACTIVITY_DB_PATH):
+    """Rollups of `username`, optionally restricted to the days between `start` and `end` (included)
+
+    Args:
+        username (str): Name of the user
+        weight (float, optional): Weight in kilograms, to add the calories (see `calories.window_calories`). Defaults to None.
+        start (str or date, optional): First day. Defaults to None.
+        end (str or date, optional): Last day. Defaults to None.
+        db_path (str, optional): SQLite file. Defaults to `ACTIVITY_DB_PATH`.
+
+    Returns:
+        Pandas DataFrame: day, activity, windows, seconds and kcal (with a `weight`), sorted by day
+    """
+    create_activity_tables(db_path)
+    query = 'SELECT day, activity, windows, seconds FROM activity_rollup WHERE username = ?'
+    params = [username]
+    if start is not None:
+        query += ' AND day >= ?'
+        params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+    if end is not None:
+        query += ' AND day <= ?'
+        params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+
+    rows = get_connection(db_path).execute(query + ' ORDER BY day, activity', params).fetchall()
+
+    rollups = pd.DataFrame(rows, columns=['day', 'activity', 'windows', 'seconds'])
+    if weight is not None:
+        # calories are proportional to the time spent in each activity
+        rollups['kcal'] = window_calories(rollups['activity'].to_numpy(), weight, rollups['seconds'].to_numpy())
+
+    return rollups
+
+
+def activity_totals(username, weight=None, **kwargs):
+    """Windows, time and calories (with a `weight`) per activity over the days of `daily_activity`
+
+    Args:
+        username (str): Name of the user
+        weight (float, optional): Weight in kilograms, see `daily_activity`. Defaults to None.
+        **kwargs: Passed to `daily_activity`
+
+    Returns:
+        Pandas DataFrame: One row per activity with windows, seconds and kcal (with a `weight`)
+    """
+    rollups = daily_activity(username, weight, **kwargs)
+
+    return rollups.groupby('activity')[rollups.columns.drop(['day', 'activity'])].sum()
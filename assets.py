@@ -0,0 +1,233 @@
+# Dependencies
+import base64
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from PIL import Image
+
+
+# Folder where downloaded assets are stored next to the apps
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+
+# Lottie animations used by the apps
+LOTTIE_URLS = {
+    'logo': 'https://assets3.lottiefiles.com/packages/lf20_sfpilpqw.json',
+    'signin': 'https://assets9.lottiefiles.com/packages/lf20_mjlh3hcy.json',
+    'signup': 'https://assets5.lottiefiles.com/packages/lf20_q5pk6p1k.json',
+    'logout': 'https://assets1.lottiefiles.com/private_files/lf30_tapgoijy.json',
+}
+
+
+class LRUCache:
+    """Thread-safe in-memory cache keeping the `maxsize` most recently used items
+
+    Args:
+        maxsize (int, optional): Maximum number of items. Defaults to 64.
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_lotties = LRUCache()
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _lottie_path(url):
+    # one json file per url, named after its key in LOTTIE_URLS so the files can be committed
+    names = {lottie_url: name for name, lottie_url in LOTTIE_URLS.items()}
+    name = names.get(url) or hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(ASSETS_DIR, 'lottie', f'{name}.json')
+
+
+def fetch_lottie(url, timeout=10):
+    """Download the lottie animation at `url` and store it in the asset folder
+
+    Args:
+        url (str): Address of the lottie json file
+        timeout (float, optional): Timeout of the request in seconds. Defaults to 10.
+
+    Returns:
+        dict: The animation, or None if it could not be downloaded
+    """
+    try:
+        r = requests.get(url, timeout=timeout)
+    except requests.RequestException:
+        return None
+    if r.status_code != 200:
+        return None
+
+    lottie = r.json()
+
+    # write to a temporary file first so readers never see half a file
+    path = _lottie_path(url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(lottie, f)
+    os.replace(tmp_path, path)
+
+    _lotties.set(url, lottie)
+
+    return lottie
+
+
+def _refresh_in_background(url):
+    # at most one download per url at a time
+    with _refreshing_lock:
+        if url in _refreshing:
+            return
+        _refreshing.add(url)
+
+    def refresh():
+        try:
+            fetch_lottie(url)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(url)
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+# app animations
+def load_lottieurl(url: str, max_age=None):
+    """Return the lottie animation of `url` from memory or from the asset folder, without any
+    network call. A missing animation, or one older than `max_age`, is downloaded in a
+    background thread and shows up on a later rerun.
+
+    Args:
+        url (str): Address of the lottie json file
+        max_age (float, optional): Age in seconds after which the stored file is refreshed, None to never refresh. Defaults to None.
+
+    Returns:
+        dict: The animation, or None if it is not available yet
+    """
+    lottie = _lotties.get(url)
+    path = _lottie_path(url)
+
+    if lottie is None and os.path.exists(path):
+        with open(path) as f:
+            lottie = json.load(f)
+        _lotties.set(url, lottie)
+
+    if lottie is None:
+        _refresh_in_background(url)
+    elif max_age is not None and (not os.path.exists(path) or time.time() - os.path.getmtime(path) > max_age):
+        _refresh_in_background(url)
+
+    return lottie
+
+
+def preload_lotties(urls=None):
+    """Download the animations into the asset folder so the apps start without network calls.
+    The files of `LOTTIE_URLS` (assets/lottie/<name>.json) are meant to be committed.
+
+    Args:
+        urls (iterable of str, optional): Addresses to download. Defaults to all `LOTTIE_URLS`.
+
+    Returns:
+        dict: url -> True if the download succeeded
+    """
+    urls = LOTTIE_URLS.values() if urls is None else urls
+
+    return {url: fetch_lottie(url) is not None for url in urls}
+
+
+# Static images
+# Images are downscaled to the width of the app column, wider files only add payload
+IMAGE_MAX_WIDTH = 1280
+
+_images = LRUCache(maxsize=128)
+
+
+def _image_key(path, *args):
+    # a modified file gets a new key, its old entry ages out of the cache
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size) + args
+
+
+def load_image(path, max_width=None):
+    """Return the encoded bytes of the image at `path`, read (and resized) once per process and
+    version of the file. The bytes can be passed to `st.image` as they are.
+
+    Args:
+        path (str): Image file
+        max_width (int, optional): Wider images are downscaled to this width, None to keep the file as is. Animated images are never resized. Defaults to None.
+
+    Returns:
+        bytes: The encoded image
+    """
+    key = _image_key(path, max_width)
+    content = _images.get(key)
+    if content is not None:
+        return content
+
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    if max_width is not None:
+        with Image.open(io.BytesIO(content)) as image:
+            if image.width > max_width and not getattr(image, 'is_animated', False):
+                fmt = image.format
+                height = round(image.height * max_width / image.width)
+                image = image.resize((max_width, height), Image.LANCZOS)
+                buffer = io.BytesIO()
+                image.save(buffer, format=fmt, **({'quality': 85, 'optimize': True} if fmt == 'JPEG' else {}))
+                content = buffer.getvalue()
+
+    _images.set(key, content)
+
+    return content
+
+
+def image_data_url(path, max_width=None):
+    """Return the image at `path` as a base64 data url, to inline it in html (see `load_image`)
+
+    Args:
+        path (str): Image file
+        max_width (int, optional): See `load_image`. Defaults to None.
+
+    Returns:
+        str: 'data:<mime type>;base64,...'
+    """
+    key = _image_key(path, max_width, 'data_url')
+    url = _images.get(key)
+    if url is None:
+        mime = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        url = f'data:{mime};base64,{base64.b64encode(load_image(path, max_width)).decode("utf-8")}'
+        _images.set(key, url)
+
+    return url
+
+
+if __name__ == '__main__':
+    for url, ok in preload_lotties().items():
+        print('ok    ' if ok else 'failed', url)
@@ -0,0 +1,351 @@
+# Dependencies
+import argparse
+import gc
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import numpy as np
+
+import sklearn
+from sklearn.impute import KNNImputer
+from sklearn.linear_model import SGDClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from imputers import TreeKNNImputer
+from numpy_predictor import export_pipeline, check_parity
+from user_store import add_users, login_user
+from utilities import select_columns, drop_col_percent_na, split_train_test, user_kfold, pipelines, perfomance
+
+
+# Synthetic dataset
+def make_dataset(nb_rows, nb_users=13, nb_features=20, random_state=0):
+    """Create a random dataset with `nb_features` float columns, a `target` and a `user` column
+
+    Args:
+        nb_rows (int): Number of rows to generate
+        nb_users (int, optional): Number of distinct users. Defaults to 13.
+        nb_features (int, optional): Number of float columns. Defaults to 20.
+        random_state (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        Pandas DataFrame: Generated dataset
+    """
+    rng = np.random.default_rng(random_state)
+
+    data = pd.DataFrame(rng.standard_normal((nb_rows, nb_features)),
+                        columns=[f'feature{i}' for i in range(nb_features)])
+    data['target'] = rng.choice(['Bus', 'Car', 'Still', 'Train', 'Walking'], nb_rows)
+    data['user'] = rng.choice([f'U{i}' for i in range(1, nb_users + 1)], nb_rows)
+
+    return data
+
+
+# Train/test split scaling
+def bench_split_train_test(sizes=(10_000, 100_000, 1_000_000, 10_000_000)):
+    """Time `split_train_test` and one pass over `user_kfold` for growing dataset sizes
+
+    Args:
+        sizes (tuple, optional): Numbers of rows to benchmark. Defaults to 10k up to 10M rows.
+
+    Returns:
+        Pandas DataFrame: Timings in seconds and time per million rows for every size
+    """
+    results = []
+    for nb_rows in sizes:
+        data = make_dataset(nb_rows)
+
+        t0 = time.perf_counter()
+        split_train_test(data)
+        split_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for _ in user_kfold(data):
+            pass
+        kfold_time = time.perf_counter() - t0
+
+        results.append({'rows': nb_rows,
+                        'split_time': split_time,
+                        'kfold_time': kfold_time,
+                        'split_time_per_1M': split_time / nb_rows * 1e6})
+
+    return pd.DataFrame(results)
+
+
+# Imputers accuracy and speed
+def bench_imputers(csv_path='data/dataset_5secondWindow.csv', hide=0.05, random_state=0):
+    """Hide a fraction of the observed sensor values, impute them with `KNNImputer` and
+    `TreeKNNImputer` and compare the error (on standardized values) and the fit + transform time
+
+    Args:
+        csv_path (str, optional): Dataset to use. Defaults to 'data/dataset_5secondWindow.csv'.
+        hide (float, optional): Fraction of observed values to hide. Defaults to 0.05.
+        random_state (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        Pandas DataFrame: RMSE on hidden values and time in seconds for every imputer
+    """
+    rng = np.random.default_rng(random_state)
+
+    X = select_columns(pd.read_csv(csv_path), '(?!activityrecognition|Unnamed|id|time|target|user).*')
+    X = X.loc[:, X.notna().any()].to_numpy(dtype=float)
+    X = (X - np.nanmean(X, axis=0)) / np.where(np.nanstd(X, axis=0) > 0, np.nanstd(X, axis=0), 1)
+
+    hidden = ~np.isnan(X) & (rng.random(X.shape) < hide)
+    X_missing = np.where(hidden, np.nan, X)
+
+    results = []
+    for name, imputer in {'knn': KNNImputer(), 'kd_tree': TreeKNNImputer(),
+                          'ball_tree': TreeKNNImputer(algorithm='ball_tree')}.items():
+        t0 = time.perf_counter()
+        imputed = imputer.fit_transform(X_missing)
+        elapsed = time.perf_counter() - t0
+
+        rmse = np.sqrt(np.mean((imputed[hidden] - X[hidden]) ** 2))
+        results.append({'imputer': name, 'rmse': rmse, 'time': elapsed})
+
+    return pd.DataFrame(results)
+
+
+# Concurrent logins load test
+def bench_logins(nb_users=500, nb_logins=5000, nb_threads=64):
+    """Register `nb_users` users in one batch then run `nb_logins` logins from `nb_threads`
+    concurrent threads (like many Streamlit sessions) against a temporary database
+
+    Args:
+        nb_users (int, optional): Number of registered users. Defaults to 500.
+        nb_logins (int, optional): Number of login attempts, one in ten with a wrong password. Defaults to 5000.
+        nb_threads (int, optional): Number of concurrent threads. Defaults to 64.
+
+    Returns:
+        Pandas DataFrame: Insert time, login time, logins per second and number of wrong results
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = os.path.join(folder, 'users.db')
+        users = [(f'user{i}', f'password{i}') for i in range(nb_users)]
+
+        t0 = time.perf_counter()
+        add_users(users, db_path)
+        insert_time = time.perf_counter() - t0
+
+        def attempt(i):
+            username, password = users[i % nb_users]
+            wrong = i % 10 == 0
+            found = login_user(username, password + '!' if wrong else password, db_path)
+            return bool(found) == wrong
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(nb_threads) as pool:
+            errors = sum(pool.map(attempt, range(nb_logins)))
+        login_time = time.perf_counter() - t0
+
+    return pd.DataFrame([{'users': nb_users,
+                          'threads': nb_threads,
+                          'insert_time': insert_time,
+                          'login_time': login_time,
+                          'logins_per_second': nb_logins / login_time,
+                          'errors': errors}])
+
+
+# Numpy export of the pipeline
+def bench_numpy_predictor(model, csv_path='data/dataset_5secondWindow.csv', user_csv_path='example_file_user.csv',
+                          columns_to_keep='accelerometer|sound|gyroscope', repeat=200):
+    """Fit the app pipeline with `model`, export it with `export_pipeline` and compare
+    predictions and single-row latency (with and without missing values) to `predict`
+
+    Args:
+        model (sklearn estimator): Tree-based classifier to put at the end of the pipeline
+        csv_path (str, optional): Training data. Defaults to 'data/dataset_5secondWindow.csv'.
+        user_csv_path (str, optional): Rows to predict. Defaults to 'example_file_user.csv'.
+        columns_to_keep (regex expression, str, optional): Features. Defaults to 'accelerometer|sound|gyroscope'.
+        repeat (int, optional): Number of timed single-row predictions. Defaults to 200.
+
+    Returns:
+        Pandas DataFrame: Parity and mean latency in milliseconds of both predictors
+    """
+    data = pd.read_csv(csv_path)
+    X = select_columns(data, columns_to_keep).to_numpy(dtype=float)
+    X_user = select_columns(pd.read_csv(user_csv_path), columns_to_keep).to_numpy(dtype=float)
+
+    pipe = pipelines({'model': model}, memory=None)['model'].fit(X, data['target'])
+    predictor = export_pipeline(pipe, X_sample=X)
+
+    results = {'parity': check_parity(pipe, predictor, X_user)}
+    rows = {'complete_row': X_user[~np.isnan(X_user).any(axis=1)][:1],
+            'row_with_nan': X_user[np.isnan(X_user).any(axis=1)][:1]}
+    for row_name, row in rows.items():
+        for name, predict in [('sklearn', pipe.predict), ('numpy', predictor.predict)]:
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                predict(row)
+            results[f'{name}_{row_name}_ms'] = (time.perf_counter() - t0) / repeat * 1000
+
+    return pd.DataFrame([results])
+
+
+# Utilities scaling suite
+# Size multipliers of the 5,893 rows of dataset_5secondWindow.csv
+BENCH_SCALES = (1, 10, 100, 1000)
+
+# Largest scale run for the functions fitting models
+MAX_SCALES = {'pipelines': 100, 'perfomance': 10}
+
+FEATURES = 'accelerometer|sound|gyroscope'
+
+
+def make_tmd_dataset(scale=1, csv_path='data/dataset_5secondWindow.csv', noise=0.05, random_state=0):
+    """Create a dataset with the columns of `csv_path` and `scale` times its rows. Rows are drawn
+    from the real ones with their missing values, target and user, so the NaN patterns (whole
+    sensors missing for some users and activities) are realistic; observed values are jittered
+    by `noise` standard deviations.
+
+    Args:
+        scale (int, optional): Number of rows as a multiple of the rows of `csv_path`. Defaults to 1.
+        csv_path (str, optional): Dataset to imitate. Defaults to 'data/dataset_5secondWindow.csv'.
+        noise (float, optional): Standard deviation of the jitter, in column standard deviations. Defaults to 0.05.
+        random_state (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        Pandas DataFrame: Generated dataset
+    """
+    rng = np.random.default_rng(random_state)
+    template = pd.read_csv(csv_path)
+    nb_rows = len(template) * scale
+    rows = rng.integers(0, len(template), nb_rows)
+
+    data = {}
+    for column in template.columns:
+        values = template[column].to_numpy()[rows]
+        if column in ('Unnamed: 0', 'id'):
+            values = np.arange(nb_rows)
+        elif template[column].dtype == float:
+            std = template[column].std()
+            if std > 0:
+                values += rng.standard_normal(nb_rows) * (noise * std)
+        data[column] = values
+
+    return pd.DataFrame(data)
+
+
+def _bench_select_columns(data):
+    select_columns(data, f'{FEATURES}|target|user')
+
+
+def _bench_drop_col_percent_na(data):
+    drop_col_percent_na(data, 50)
+
+
+def _bench_split_train_test(data):
+    split_train_test(data)
+
+
+def _bench_pipelines(data):
+    # approximate imputation: exact KNN is quadratic in the number of rows
+    pipe = pipelines({'sgd': SGDClassifier(random_state=0)}, memory=None, imputation='tree')['sgd']
+    pipe.fit(select_columns(data, FEATURES).to_numpy(dtype=float), data['target'])
+
+
+def _bench_perfomance(data):
+    train, test = split_train_test(data)
+    pipes = pipelines({'sgd': SGDClassifier(random_state=0), 'dt': DecisionTreeClassifier(random_state=0)},
+                      memory=None, imputation='tree')
+    perfomance(pipes, select_columns(train, FEATURES), train['target'],
+               select_columns(test, FEATURES), test['target'], n_jobs=1)
+
+
+UTILITIES_BENCHMARKS = {
+    'select_columns': _bench_select_columns,
+    'drop_col_percent_na': _bench_drop_col_percent_na,
+    'split_train_test': _bench_split_train_test,
+    'pipelines': _bench_pipelines,
+    'perfomance': _bench_perfomance,
+}
+
+
+def _measure(func, data):
+    # time without tracing, then peak memory of a second, traced, call
+    gc.collect()
+    t0 = time.perf_counter()
+    func(data)
+    wall_time = time.perf_counter() - t0
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return wall_time, peak
+
+
+def bench_utilities(scales=BENCH_SCALES, functions=None, output_dir='bench_results',
+                    csv_path='data/dataset_5secondWindow.csv'):
+    """Run the functions of `UTILITIES_BENCHMARKS` on generated datasets (see `make_tmd_dataset`)
+    of every scale and record their wall time and peak memory (Python and numpy allocations
+    traced by `tracemalloc` in this process, worker processes are not included). Functions
+    are skipped above their `MAX_SCALES` entry.
+
+    Args:
+        scales (tuple, optional): Dataset sizes as multiples of the rows of `csv_path`. Defaults to `BENCH_SCALES`.
+        functions (list of str, optional): Names of the functions to run, None for all. Defaults to None.
+        output_dir (str, optional): Folder receiving utilities.csv and utilities.json, None to write nothing. Defaults to 'bench_results'.
+        csv_path (str, optional): Dataset to imitate. Defaults to 'data/dataset_5secondWindow.csv'.
+
+    Returns:
+        Pandas DataFrame: One row per function and scale with rows, wall_time (s), peak_memory_mb and time per million rows
+    """
+    functions = list(UTILITIES_BENCHMARKS) if functions is None else functions
+
+    results = []
+    for scale in scales:
+        todo = [name for name in functions if scale <= MAX_SCALES.get(name, max(scales))]
+        if not todo:
+            continue
+
+        data = make_tmd_dataset(scale, csv_path)
+        for name in todo:
+            wall_time, peak = _measure(UTILITIES_BENCHMARKS[name], data)
+            results.append({'function': name,
+                            'scale': scale,
+                            'rows': len(data),
+                            'wall_time': wall_time,
+                            'peak_memory_mb': peak / 2 ** 20,
+                            'time_per_1M_rows': wall_time / len(data) * 1e6})
+        del data
+
+    results = pd.DataFrame(results)
+
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        results.to_csv(os.path.join(output_dir, 'utilities.csv'), index=False)
+        with open(os.path.join(output_dir, 'utilities.json'), 'w') as f:
+            json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                                   'cpus': os.cpu_count(), 'numpy': np.__version__,
+                                   'pandas': pd.__version__, 'sklearn': sklearn.__version__},
+                       'results': results.to_dict(orient='records')}, f, indent=2)
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the benchmarks')
+    parser.add_argument('--scales', type=int, nargs='+', default=list(BENCH_SCALES),
+                        help='dataset sizes of the utilities suite, as multiples of the original rows')
+    parser.add_argument('--functions', nargs='+', choices=list(UTILITIES_BENCHMARKS), default=None)
+    parser.add_argument('--output-dir', default='bench_results')
+    parser.add_argument('--utilities-only', action='store_true')
+    args = parser.parse_args()
+
+    if not args.utilities_only:
+        print(bench_split_train_test())
+        print(bench_imputers())
+        print(bench_logins())
+    print(bench_utilities(args.scales, args.functions, args.output_dir))
@@ -0,0 +1,109 @@
+# Dependencies
+import pandas as pd
+import numpy as np
+
+
+# Metabolic equivalent of a task (MET): how many times more energy an activity burns than
+# sitting still for the same period of time (MET = 1)
+
+# MET of the predicted classes, any other class (vehicles) uses `DEFAULT_MET`
+ACTIVITY_MET = {'walking': 3.8, 'still': 1.0}
+DEFAULT_MET = 1.5
+
+# MET of the activities offered on the planning pages
+PLANNING_MET = {
+    '💃 aerobics': 6.83,
+    '📺 watching TV': 1,
+    '⚾ baseball,softball': 5,
+    '⛹️ basketball': 8,
+    '🎱 billiards': 2.5,
+    '🚣‍♂️ rowing': 4.64,
+    '🚴 cycling': 9.5,
+    '🕺 dancing': 4.5,
+    '🚘 driving': 1.3,
+    '🎣 fishing': 4.5,
+    '🏌️ golfing': 3.75,
+    '😴 sleeping': 1,
+    '🚉 public transport': 1,
+    '🧍standing': 1.5,
+    '🏊 swimming': 8,
+    '🚶walking': 3.8,
+    '🏃 running': 9.8,
+}
+
+# Duration of a window of the dataset, in seconds
+WINDOW_SECONDS = 5
+
+
+def calories_per_minute(met, weight):
+    """Calories (kcal) burnt per minute of an activity
+
+    Args:
+        met (float or numpy array): MET of the activity
+        weight (float): Weight in kilograms
+
+    Returns:
+        float or numpy array: kcal per minute
+    """
+    return met * 3.5 * weight / 200
+
+
+def met_values(activities, met_table=ACTIVITY_MET, default_met=DEFAULT_MET):
+    """Look up the MET of every activity, each distinct activity is looked up once
+
+    Args:
+        activities (array-like): Activity per window, e.g. model predictions
+        met_table (dict, optional): MET per activity. Defaults to `ACTIVITY_MET`.
+        default_met (float, optional): MET of activities missing from `met_table`. Defaults to `DEFAULT_MET`.
+
+    Returns:
+        numpy array: MET per window
+    """
+    classes, codes = np.unique(np.asarray(activities), return_inverse=True)
+    table = np.array([met_table.get(c, default_met) for c in classes], dtype=float)
+
+    return table[codes.ravel()]
+
+
+def window_calories(activities, weight, durations=WINDOW_SECONDS, **kwargs):
+    """Calories (kcal) burnt during every window
+
+    Args:
+        activities (array-like): Activity per window, e.g. model predictions
+        weight (float): Weight in kilograms
+        durations (float or array-like, optional): Duration of the windows in seconds. Defaults to `WINDOW_SECONDS`.
+        **kwargs: Passed to `met_values`
+
+    Returns:
+        numpy array: kcal per window
+    """
+    minutes = np.asarray(durations, dtype=float) / 60
+
+    return calories_per_minute(met_values(activities, **kwargs), weight) * minutes
+
+
+def cumulative_calories(activities, weight, durations=WINDOW_SECONDS, **kwargs):
+    """Running total of the calories (kcal) burnt after every window (see `window_calories`)
+
+    Returns:
+        numpy array: kcal burnt from the first window up to each window
+    """
+    return np.cumsum(window_calories(activities, weight, durations, **kwargs))
+
+
+def activity_summary(activities, weight, durations=WINDOW_SECONDS, **kwargs):
+    """Number of windows, time and calories per activity (see `window_calories`)
+
+    Returns:
+        Pandas DataFrame: One row per activity with windows, seconds and kcal
+    """
+    activities = np.asarray(activities)
+    classes, codes = np.unique(activities, return_inverse=True)
+    codes = codes.ravel()
+    seconds = np.broadcast_to(np.asarray(durations, dtype=float), activities.shape)
+    kcal = window_calories(activities, weight, seconds, **kwargs)
+
+    return pd.DataFrame({'windows': np.bincount(codes, minlength=len(classes)),
+                         'seconds': np.bincount(codes, weights=seconds, minlength=len(classes)),
+                         'kcal': np.bincount(codes, weights=kcal, minlength=len(classes))},
+                        index=pd.Index(classes, name='activity'))
@@ -0,0 +1,80 @@
+# Dependencies
+import numpy as np
+
+from sklearn.base import clone
+
+from utilities import select_columns, pipelines
+
+
+# Nested sensor subsets, from most to least complete
+SENSOR_SUBSETS = ['accelerometer|sound|gyroscope', 'accelerometer|gyroscope', 'accelerometer']
+
+
+class ModelCascade:
+    """Holds models trained on nested sensor subsets and sends every row to the first model
+    (in the given order) whose columns are all present in that row, so missing sensors are not
+    imputed. Rows with none of the models complete go to the last model, which imputes them.
+    Each model predicts its rows with a single vectorized call.
+
+    Args:
+        models (list): (columns_to_keep regex, fitted pipeline) pairs, preferred model first
+    """
+
+    def __init__(self, models):
+        self.models = models
+        self.last_routes_ = {}
+
+    def predict(self, data):
+        """Predict the rows of `data`
+
+        Args:
+            data (Pandas DataFrame): Sensor windows with the dataset column names
+
+        Returns:
+            numpy array: One prediction per row
+        """
+        preds = np.empty(len(data), dtype=object)
+        todo = np.ones(len(data), dtype=bool)
+        self.last_routes_ = {}
+
+        for i, (columns_to_keep, model) in enumerate(self.models):
+            features = select_columns(data, columns_to_keep)
+            if features.shape[1] == 0:
+                continue
+
+            is_last = i == len(self.models) - 1
+            complete = features.notna().all(axis=1).to_numpy()
+            rows = todo if is_last else todo & complete
+            if rows.any():
+                preds[rows] = model.predict(features.to_numpy(dtype=float)[rows])
+                todo &= ~rows
+            self.last_routes_[columns_to_keep] = int(rows.sum())
+
+        # only possible when the last model's sensors are absent from `data`
+        if todo.any():
+            raise ValueError(f'{todo.sum()} rows have no usable model')
+
+        return preds
+
+
+def train_cascade(data, model, sensor_subsets=SENSOR_SUBSETS, target='target', **pipeline_kwargs):
+    """Train one pipeline (see `pipelines`) per sensor subset and return the cascade
+
+    Args:
+        data (Pandas DataFrame): Training set with the dataset column names and `target`
+        model (sklearn estimator): Model cloned for every subset
+        sensor_subsets (list of str, optional): columns_to_keep regex per model, preferred first. Defaults to `SENSOR_SUBSETS`.
+        target (str, optional): Target column. Defaults to 'target'.
+        **pipeline_kwargs: Passed to `pipelines`
+
+    Returns:
+        ModelCascade: Fitted cascade
+    """
+    y = data[target]
+    models = []
+    for columns_to_keep in sensor_subsets:
+        pipe = pipelines({columns_to_keep: clone(model)}, **pipeline_kwargs)[columns_to_keep]
+        pipe.fit(select_columns(data, columns_to_keep).to_numpy(dtype=float), y)
+        models.append((columns_to_keep, pipe))
+
+    return ModelCascade(models)
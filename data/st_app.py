@@ -1,14 +1,20 @@
-import joblib
+import os
+import sys
 from utilities import select_columns
 
+# modules shared with the main app live in the parent folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_registry import load_model
+
 # import sleep to show output for some time period
 from time import sleep
 import streamlit as st
 import pandas as pd
 from streamlit_option_menu import option_menu
 from streamlit_lottie import st_lottie
-import requests
-import sqlite3
+from assets import load_lottieurl, LOTTIE_URLS, load_image, IMAGE_MAX_WIDTH
+from user_store import create_usertable, add_userdata, login_user, view_all_users
+from calories import calories_per_minute, PLANNING_MET
 import streamlit.components.v1 as stc
 
 
@@ -25,66 +31,24 @@ import streamlit.components.v1 as stc
 # font = "Serif"
 
 
-# DB Management, to store data
-conn = sqlite3.connect('data.db')
-info_data = conn.cursor()
-
-
-def create_usertable():
-    info_data.execute(
-        'CREATE TABLE IF NOT EXISTS userstable(username TEXT, password TEXT)')
-
-
-def add_userdata(username, password):
-    info_data.execute(
-        'INSERT INTO userstable(username, password) VALUES(?,?)', (username, password))
-
-
-conn.commit()
+# DB Management, to store data (schema is created once per server process)
+create_usertable()
 
 
-def login_user(username, password):
-    info_data.execute(
-        'SELECT * FROM userstable WHERE username = ? AND password = ?', (username, password))
-    data = info_data.fetchall()
-    return data
-
-
-def view_all_users():
-    info_data.execute('SELECT * FROM userstable')
-    data = info_data.fetchall()
-    return data
-
-
-# app logo
-def load_lottieurl(url: str):
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None
-    return r.json()
-
+# app logo (animations are read from the local asset folder, see assets.py)
 
 with st.sidebar:
 
-    lottie_url = "https://assets3.lottiefiles.com/packages/lf20_sfpilpqw.json"
+    lottie_url = LOTTIE_URLS['logo']
     lottie_json = load_lottieurl(lottie_url)
     st_lottie(lottie_json)
 
 
 # sign in
-def load_lottieurl(url: str):
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None
-    return r.json()
-
 
-lottie_signin = load_lottieurl(
-    "https://assets9.lottiefiles.com/packages/lf20_mjlh3hcy.json")
-lottie_signup = load_lottieurl(
-    "https://assets5.lottiefiles.com/packages/lf20_q5pk6p1k.json")
-lottie_logout = load_lottieurl(
-    "https://assets1.lottiefiles.com/private_files/lf30_tapgoijy.json")
+lottie_signin = load_lottieurl(LOTTIE_URLS['signin'])
+lottie_signup = load_lottieurl(LOTTIE_URLS['signup'])
+lottie_logout = load_lottieurl(LOTTIE_URLS['logout'])
 
 
 # Menu
@@ -106,7 +70,7 @@ with st.sidebar:
 # Home page
 if app_mode == 'Home':
     st.title('**Model for Fitness Software using TMD dataset**')
-    st.image("Downloads\\fit.jpg", use_column_width=True)
+    st.image(load_image("Downloads\\fit.jpg", IMAGE_MAX_WIDTH), use_column_width=True)
 
     # it use to read and upload the file
 
@@ -137,7 +101,6 @@ elif app_mode == 'Sign in':
         password = st.text_input("Password", type="password")
 
         if st.button("Login"):
-            create_usertable()
             result = login_user(username, password)
 
             if result:
@@ -173,7 +136,6 @@ elif app_mode == 'Create an account':
         new_password = st.text_input("Password", type="password")
 
         if st.button("Signup"):
-            create_usertable()
             result1 = add_userdata(new_username, new_password)
 
     st.warning("Please enter your username and password")
@@ -191,7 +153,7 @@ elif app_mode == "LoggedIn":
     # MODEL INTEGRATION
     # 1. load model
     # (hey Ritthuja, everything that is commented out is just experimenting, you can safely ignore it)
-    model = joblib.load('model.joblib')
+    model = load_model('model.joblib')
     # 2. load data
     data = pd.read_csv('example_file_user.csv')
 
@@ -205,10 +167,12 @@ elif app_mode == "LoggedIn":
         demo = st.radio('Prediction demo', ['start', 'stop'], index=1)
         with col1:
             # activities_counts = {'walking': 0, 'still': 0, 'bus_car_train': 0} ()
-            for _, row in data.iterrows():
+            # all windows are predicted at once, then replayed one by one
+            preds = model.predict(data.values) if demo == 'start' else []
+
+            for pred in preds:
                 if demo == 'start':
                     placeholder = st.empty()
-                    pred = model.predict(row.values.reshape(1, -1))[0]
 
                     if pred == 'walking':
                         placeholder.image(
@@ -277,63 +241,8 @@ elif app_mode == "LoggedIn":
 
     st.write('You selected:', option)
 
-    if option == '💃 aerobics':
-        MET = 6.83
-        st.write('Your MET is :', MET)
-
-    elif option == '📺 watching TV':
-        MET = 1
-        st.write('Your MET is :', MET)
-
-    elif option == '⚾ baseball,softball':
-        MET = 5
-        st.write('Your MET is :', MET)
-
-    elif option == '⛹️ basketball':
-        MET = 8
-        st.write('Your MET is :', MET)
-
-    elif option == '🎱 billiards':
-        MET = 2.5
-        st.write('Your MET is :', MET)
-
-    elif option == '🧍standing':
-        MET = 1.5
-        st.write('Your MET is :', MET)
-
-    elif option == '🚣‍♂️ rowing':
-        MET = 4.64
-        st.write('Your MET is :', MET)
-
-    elif option == '🚴 cycling':
-        MET = 9.5
-        st.write('Your MET is :', MET)
-
-    elif option == '🕺 dancing':
-        MET = 4.5
-        st.write('Your MET is :', MET)
-
-    elif option == '🎣 fishing':
-        MET = 4.5
-        st.write('Your MET is :', MET)
-    elif option == '🏌️ golfing':
-        MET = 3.75
-        st.write('Your MET is :', MET)
-    elif option == '😴 sleeping':
-        MET = 1
-        st.write('Your MET is :', MET)
-    elif option == '🏊 swimming':
-        MET = 8
-        st.write('Your MET is :', MET)
-    elif option == '🚶walking':
-        MET = 3.8
-        st.write('Your MET is :', MET)
-    elif option == '🚘 driving':
-        MET = 1.3
-        st.write('Your MET is :', MET)
-    elif option == '🏃 running':
-        MET = 9.8
-        st.write('Your MET is :', MET)
+    MET = PLANNING_MET[option]
+    st.write('Your MET is :', MET)
 
     with st.expander("See explanation"):
         st.write("""
@@ -341,7 +250,7 @@ elif app_mode == "LoggedIn":
      """)
 
     # calculation
-    calories = MET * 3.5 * kilograms / 200
+    calories = calories_per_minute(MET, kilograms)
     st.subheader("\n Calories burned per mintues: {} kcal".format(
         round(calories, 2)))
 
@@ -1,41 +1,119 @@
 import pandas as pd
 import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.preprocessing import OrdinalEncoder
-from sklearn.impute import SimpleImputer
 
+from dataset_cache import load_dataset
 
-def data_cleaning(csv_path):
-    df = pd.read_csv(csv_path)
 
-    columns = ['activityrecognition#1', 'android.sensor.accelerometer#mean',
-               'android.sensor.game_rotation_vector#mean',
-               'android.sensor.gravity#mean', 'android.sensor.gyroscope#mean',
-               'android.sensor.gyroscope_uncalibrated#mean',
-               'android.sensor.linear_acceleration#mean',
-               'android.sensor.magnetic_field#mean',
-               'android.sensor.magnetic_field_uncalibrated#mean',
-               'android.sensor.orientation#mean',
-               'android.sensor.rotation_vector#mean', 'sound#mean', 'speed#mean', 'target', 'user']
-    df = df[columns]
-    df = df.sort_values(by='user')
+# Columns kept after cleaning
+FEATURES = ['android.sensor.accelerometer#mean', 'sound#mean', 'android.sensor.gyroscope#mean', 'speed#mean']
+LABELS = ['target', 'user']
 
-    ord_encoder = OrdinalEncoder(categories=[df['target'].unique(), df['user'].unique()])
-    df[['target', 'user']] = ord_encoder.fit_transform(df[['target', 'user']])
 
-    df_copy = df
+class DataCleaner(BaseEstimator, TransformerMixin):
+    """Select `features` and `labels`, ordinal-encode the labels and fill missing features with
+    their mean, in a single pass over each frame. Can be fitted chunk by chunk with `partial_fit`
+    and saved with joblib.
 
-    df[['target', 'user']] = df_copy[['target', 'user']].astype(int)
-    df = df.dropna()
-    df_copy[['target', 'user']] = df_copy[['target', 'user']].astype(int)
+    Args:
+        features (list of str, optional): Numerical columns to keep. Defaults to `FEATURES`.
+        labels (list of str, optional): Text columns to ordinal-encode. Defaults to `LABELS`.
+    """
 
-    # df = df.groupby(['user', 'target']).transform(lambda x: x.fillna(x.mean()))
+    def __init__(self, features=FEATURES, labels=LABELS):
+        self.features = features
+        self.labels = labels
 
-    df[['target', 'user']] = df_copy[['target', 'user']].astype(int)
+    def partial_fit(self, df, y=None):
+        if not hasattr(self, 'categories_'):
+            self.categories_ = {label: set() for label in self.labels}
+            self._sums = np.zeros(len(self.features))
+            self._counts = np.zeros(len(self.features))
 
-    impute = SimpleImputer(missing_values=np.nan, strategy='mean')
-    df = impute.fit_transform(df)
+        for label in self.labels:
+            self.categories_[label].update(df[label].dropna().unique())
 
-    df = pd.DataFrame(df, columns=df_copy.columns)
-    columns_three = ['android.sensor.accelerometer#mean', 'sound#mean', 'android.sensor.gyroscope#mean', 'speed#mean', 'target', 'user']
-    df = df[columns_three]
-    return 
\ No newline at end of file
+        values = df[self.features].to_numpy(dtype=float)
+        observed = ~np.isnan(values)
+        self._sums += np.where(observed, values, 0).sum(axis=0)
+        self._counts += observed.sum(axis=0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.means_ = np.where(self._counts > 0, self._sums / self._counts, 0)
+
+        return self
+
+    def fit(self, df, y=None):
+        for attribute in ('categories_', '_sums', '_counts'):
+            self.__dict__.pop(attribute, None)
+
+        return self.partial_fit(df)
+
+    @property
+    def encoder_(self):
+        """Fitted `OrdinalEncoder` of the labels, to decode predictions"""
+        categories = [sorted(self.categories_[label]) for label in self.labels]
+        encoder = OrdinalEncoder(categories=categories, dtype=int)
+
+        return encoder.fit(pd.DataFrame([[c[0] for c in categories]], columns=self.labels))
+
+    def transform(self, df):
+        # features: one float array, missing values filled in place
+        values = df[self.features].to_numpy(dtype=float, copy=True)
+        np.copyto(values, np.broadcast_to(self.means_, values.shape), where=np.isnan(values))
+
+        cleaned = pd.DataFrame(values, columns=self.features, index=df.index)
+
+        # labels: integer codes, -1 for values unseen during fit
+        for label in self.labels:
+            categories = sorted(self.categories_[label])
+            cleaned[label] = pd.Categorical(df[label], categories=categories).codes.astype(int)
+
+        return cleaned
+
+
+def iter_clean_chunks(csv_path, chunksize, cleaner=None):
+    """Clean a CSV too big for memory: a first pass over the chunks fits `cleaner` (unless
+    already fitted), a second pass yields the cleaned chunks
+
+    Args:
+        csv_path (str): CSV file to clean
+        chunksize (int): Number of rows per chunk
+        cleaner (DataCleaner, optional): Fitted cleaner to reuse. Defaults to a new one.
+
+    Yields:
+        Tuple(Pandas DataFrame, DataCleaner): Cleaned chunk and the fitted cleaner
+    """
+    if cleaner is None:
+        cleaner = DataCleaner()
+        for chunk in pd.read_csv(csv_path, usecols=cleaner.features + cleaner.labels, chunksize=chunksize):
+            cleaner.partial_fit(chunk)
+
+    for chunk in pd.read_csv(csv_path, usecols=cleaner.features + cleaner.labels, chunksize=chunksize):
+        yield cleaner.transform(chunk), cleaner
+
+
+def data_cleaning(csv_path, chunksize=None):
+    """Load `csv_path`, keep the accelerometer, sound, gyroscope and speed means, encode target
+    and user as integers and impute missing values with column means
+
+    Args:
+        csv_path (str): CSV file to clean
+        chunksize (int, optional): Read the CSV by chunks of this many rows, None to load it at once. Defaults to None.
+
+    Returns:
+        Tuple(Pandas DataFrame, OrdinalEncoder): Cleaned dataset (sorted by user) and the encoder of target and user
+    """
+    if chunksize is None:
+        cleaner = DataCleaner()
+        df = load_dataset(csv_path, columns=cleaner.features + cleaner.labels)
+        df = cleaner.fit_transform(df)
+    else:
+        chunks = list(iter_clean_chunks(csv_path, chunksize))
+        df = pd.concat([chunk for chunk, _ in chunks])
+        cleaner = chunks[-1][1]
+
+    df = df.sort_values(by='user', kind='stable')
+
+    return df, cleaner.encoder_
@@ -0,0 +1,148 @@
+# Dependencies
+import hashlib
+import json
+import os
+
+import pandas as pd
+import numpy as np
+
+from utilities import CACHE_DIR, ColumnSchema
+
+
+# Folder of the converted datasets, one sub-folder per CSV content hash
+DATASETS_DIR = os.path.join(CACHE_DIR, 'datasets')
+
+# content hash of already seen files: (path, mtime, size) -> hash
+_hashes = {}
+
+
+def file_hash(path):
+    """SHA1 of the content of `path`, computed once per file version in this process
+
+    Args:
+        path (str): File to hash
+
+    Returns:
+        str: Hexadecimal digest
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _hashes:
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(block)
+        _hashes[key] = sha1.hexdigest()
+
+    return _hashes[key]
+
+
+def _write_columns(data, folder):
+    # one .npy file per column, text columns stored as integer codes + categories
+    columns = []
+    for i, name in enumerate(data.columns):
+        values = data[name]
+        column = {'name': name, 'file': f'{i}.npy'}
+
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            np.save(os.path.join(folder, column['file']), values.to_numpy())
+        else:
+            codes, categories = pd.factorize(values)
+            np.save(os.path.join(folder, column['file']), codes.astype(np.int32))
+            column['categories'] = [str(c) for c in categories]
+
+        columns.append(column)
+
+    return columns
+
+
+# CSV -> columnar cache
+def build_cache(csv_path, **read_csv_kwargs):
+    """Parse `csv_path` once and store every column as a typed .npy file under `DATASETS_DIR`.
+    Does nothing if the cache of this file content and these `read_csv_kwargs` already exists.
+
+    Args:
+        csv_path (str): CSV file to convert
+        **read_csv_kwargs: Passed to `pd.read_csv`, part of the cache key
+
+    Returns:
+        str: Folder of the cached columns
+    """
+    name = file_hash(csv_path)
+    if read_csv_kwargs:
+        # other parsing options give other columns, they get their own folder
+        options = repr(sorted(read_csv_kwargs.items()))
+        name += '-' + hashlib.sha1(options.encode('utf-8')).hexdigest()[:16]
+    folder = os.path.join(DATASETS_DIR, name)
+    meta_path = os.path.join(folder, 'meta.json')
+    if os.path.exists(meta_path):
+        return folder
+
+    os.makedirs(folder, exist_ok=True)
+    columns = _write_columns(pd.read_csv(csv_path, **read_csv_kwargs), folder)
+
+    # meta.json is written last, its presence marks a complete cache
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump({'source': os.path.basename(csv_path), 'columns': columns}, f)
+    os.replace(meta_path + '.tmp', meta_path)
+
+    return folder
+
+
+def load_cache(folder, columns=None, columns_to_keep=None, mmap=True):
+    """Load a columnar cache folder (see `build_cache`). Only the requested columns are read,
+    and numerical columns are memory-mapped so just the touched bytes come from disk.
+
+    Args:
+        folder (str): Folder holding meta.json and the .npy columns
+        columns (list of str, optional): Names of the columns to load. Defaults to all.
+        columns_to_keep (regex expression, str, optional): Same filter as `select_columns`, applied before loading. Defaults to None.
+        mmap (bool, optional): Memory-map numerical columns (read-only) instead of reading them. Defaults to True.
+
+    Returns:
+        Pandas DataFrame: The dataset, with the same columns and dtypes as `pd.read_csv`
+    """
+    with open(os.path.join(folder, 'meta.json')) as f:
+        meta = json.load(f)['columns']
+
+    # column projection
+    if columns is not None:
+        wanted = set(columns)
+        missing = wanted.difference(c['name'] for c in meta)
+        if missing:
+            raise KeyError(f'Columns not in {folder}: {sorted(missing)}')
+        meta = [c for c in meta if c['name'] in wanted]
+    if columns_to_keep is not None:
+        positions = ColumnSchema([c['name'] for c in meta]).match(columns_to_keep)
+        meta = [meta[p] for p in positions]
+
+    data = {}
+    for column in meta:
+        values = np.load(os.path.join(folder, column['file']), mmap_mode='r' if mmap else None)
+        if 'categories' in column:
+            categories = np.array(column['categories'] + [np.nan], dtype=object)
+            values = categories[values]  # code -1 (missing) picks the trailing NaN
+        data[column['name']] = values
+
+    return pd.DataFrame(data, copy=False)
+
+
+def load_dataset(csv_path, columns=None, columns_to_keep=None, mmap=True):
+    """Load `csv_path` from its columnar cache, built on first use (see `load_cache`)
+
+    Args:
+        csv_path (str): CSV file to load
+        columns (list of str, optional): Names of the columns to load. Defaults to all.
+        columns_to_keep (regex expression, str, optional): Same filter as `select_columns`, applied before loading. Defaults to None.
+        mmap (bool, optional): Memory-map numerical columns (read-only) instead of reading them. Defaults to True.
+
+    Returns:
+        Pandas DataFrame: The dataset, with the same columns and dtypes as `pd.read_csv`
+    """
+    return load_cache(build_cache(csv_path), columns, columns_to_keep, mmap)
+
+
+if __name__ == '__main__':
+    for name in ['dataset_5secondWindow.csv', 'dataset1_5secondWindow.csv',
+                 'dataset2_5secondWindow.csv', 'dataset3_5secondWindow.csv']:
+        print(build_cache(os.path.join('data', name)))
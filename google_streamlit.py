@@ -1,14 +1,16 @@
 import streamlit as st
 import pandas as pd
-from time import sleep
-from utilities import select_columns
+from utilities import select_columns, predict_batches
 from streamlit_option_menu import option_menu
 from streamlit_lottie import st_lottie
-import requests
-import sqlite3
-import joblib
+from streamlit_autorefresh import st_autorefresh
+from assets import load_lottieurl, LOTTIE_URLS, load_image, IMAGE_MAX_WIDTH, image_data_url
+from user_store import create_usertable, add_userdata, login_user, view_all_users
+from model_registry import load_model
+from calories import cumulative_calories, calories_per_minute, PLANNING_MET, WINDOW_SECONDS
+from activity_store import record_windows, daily_activity
+from replay import ReplayScheduler
 import streamlit.components.v1 as stc
-import base64
 
 
 
@@ -30,68 +32,17 @@ import base64
 
 
 
-# calculate calories with data
-def activity_calories(activity, weight, time):
-    # weight in kilogram, time in second
-    # metabolic equivalent of a task. This measure tells you
-    # how many calories you burn per hour of activity, per
-    # one kilogram of body weight
-    # unit of calory burnt is kcal
-
-    if activity == 'walking':
-        MET = 3.8
-        return (time * MET * 3.5 * weight) / (200*60)
-    elif activity == 'still':
-        MET = 1
-        return (time * MET * 3.5 * weight) / (200*60)
-    else:
-        MET = 1.5
-        return (time * MET * 3.5 * weight) / (200*60)
-
-
-
-
-
-
-# DB Management, to store data
-conn = sqlite3.connect('data.db')
-info_data = conn.cursor()
+# DB Management, to store data (schema is created once per server process)
+create_usertable()
 
 
-def create_usertable():
-    info_data.execute('CREATE TABLE IF NOT EXISTS userstable(username TEXT, password TEXT)')
 
-def add_userdata(username, password):
-    info_data.execute('INSERT INTO userstable(username, password) VALUES(?,?)', (username,password))
-    conn.commit()
-    x=1
-    return x
 
-def login_user(username,password):
-    info_data.execute('SELECT * FROM userstable WHERE username = ? AND password = ?', (username,password))
-    data = info_data.fetchall()
-    return data
-
-
-def view_all_users():
-    info_data.execute('SELECT * FROM userstable')
-    data = info_data.fetchall()
-    return data
-
-
-
-
-
-# app logo
-def load_lottieurl(url: str):
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None
-    return r.json()
 
+# app logo (animations are read from the local asset folder, see assets.py)
 with st.sidebar:
 
-    lottie_url = "https://assets3.lottiefiles.com/packages/lf20_sfpilpqw.json"
+    lottie_url = LOTTIE_URLS['logo']
     lottie_json = load_lottieurl(lottie_url)
     st_lottie(lottie_json, height=300)
 
@@ -101,15 +52,9 @@ with st.sidebar:
 
 
 # sign in 
-def load_lottieurl(url: str):
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None
-    return r.json()
-
-lottie_signin = load_lottieurl("https://assets9.lottiefiles.com/packages/lf20_mjlh3hcy.json")
-lottie_signup = load_lottieurl("https://assets5.lottiefiles.com/packages/lf20_q5pk6p1k.json")
-lottie_logout = load_lottieurl("https://assets1.lottiefiles.com/private_files/lf30_tapgoijy.json")
+lottie_signin = load_lottieurl(LOTTIE_URLS['signin'])
+lottie_signup = load_lottieurl(LOTTIE_URLS['signup'])
+lottie_logout = load_lottieurl(LOTTIE_URLS['logout'])
 
 
 
@@ -124,11 +69,12 @@ def logged_in():
 
     # MODEL INTEGRATION
 
-    # 1. load model
-    model = joblib.load('C:\\Users\\ritth\\code\\Strive\\Google-Fit\\theo.joblib')
+    # 1. load model (once per server process)
+    model = load_model('C:\\Users\\ritth\\code\\Strive\\Google-Fit\\theo.joblib')
 
     # 2. load data
-    data = pd.read_csv('C:\\Users\\ritth\\code\\Strive\\Google-Fit\\example_file_user.csv')
+    data_path = 'C:\\Users\\ritth\\code\\Strive\\Google-Fit\\example_file_user.csv'
+    data = pd.read_csv(data_path)
 
     # 3. feature selection
     keep_columns = 'accelerometer|sound|gyroscope'
@@ -140,63 +86,69 @@ def logged_in():
 
     with right_column:
         demo = st.radio('Prediction demo', ['start', 'stop'], index=1)
+        speed = st.select_slider('Playback speed', [1, 2, 5, 10, 60], value=1,
+                                 format_func=lambda x: f'x{x}')
+        fast_forward = st.button('Fast-forward 1 min')
+        skip = st.button('Skip to the end')
 
+    if demo == 'stop':
+        st.session_state.pop('replay', None)
 
-        with left_column:
-            walk_count, still_count, vehicle_count = 0, 0, 0
-            calories = 0
-
-            for _, row in data.iterrows():
-                if demo == 'start':
-                    placeholder = st.empty()
-                    placeholder2 = st.empty()
-                    pred = model.predict(row.values.reshape(1, -1))[0]
-
-
-                    if pred == 'walking':
-                        walk_count += 1
-                        time = walk_count * 5
-                        placeholder.image(
-                            'Downloads\\walking.jpg', use_column_width=True)
-
-                        sleep(2)
-                        placeholder.empty()
-
-
-                    elif pred == 'still':
-                        still_count += 1
-                        time = still_count * 5
-                        placeholder.image(
-                            'Downloads\\standing.jpg', use_column_width=True)
-
-                        sleep(2)
-                        placeholder.empty()    
-
-                        
-
-                    else:
-                        vehicle_count += 1
-                        time = vehicle_count * 5
-                        placeholder.image(
-                            'Downloads\\public_transport.jpg', use_column_width=True)
-
-                        sleep(2)
-                        placeholder.empty()
-
-                        
+    else:
+        # all windows are predicted once per replay, reruns only read the scheduler
+        if st.session_state.get('replay', {}).get('weight') != weight:
+            preds = predict_batches(model, data)
+
+            # add the windows of this file not recorded yet to the user's daily rollups
+            username = st.session_state.get('username', 'guest')
+            record_windows(username, preds, source=data_path)
+
+            st.session_state.replay = {
+                'weight': weight,
+                'preds': preds,
+                # running total of the calories after each 5-second window
+                'calories': cumulative_calories(preds, weight),
+                'scheduler': ReplayScheduler(len(preds), rate=speed / WINDOW_SECONDS)}
+
+        replay = st.session_state.replay
+        scheduler = replay['scheduler']
+        if scheduler.rate != speed / WINDOW_SECONDS:
+            scheduler.set_rate(speed / WINDOW_SECONDS)
+        if fast_forward:
+            scheduler.fast_forward(60 // WINDOW_SECONDS)
+        if skip:
+            scheduler.fast_forward()
+
+        # window being played: position counts the windows already played, the last one stays on screen once the replay is over
+        i = min(scheduler.position, scheduler.nb_windows - 1)
+        pred = replay['preds'][i]
 
-                else:
-                    break
+        with left_column:
+            if pred == 'walking':
+                st.image(load_image('Downloads\\walking.jpg', IMAGE_MAX_WIDTH), use_column_width=True)
+            elif pred == 'still':
+                st.image(load_image('Downloads\\standing.jpg', IMAGE_MAX_WIDTH), use_column_width=True)
+            else:
+                st.image(load_image('Downloads\\public_transport.jpg', IMAGE_MAX_WIDTH), use_column_width=True)
 
-                with col3:
-                    
-                    calories += activity_calories(pred, weight, time)
-                    placeholder2.subheader(
-                        f'You burnt {round(calories, 3)} kcal in total')
+        with col3:
+            st.subheader(f'You burnt {round(replay["calories"][i], 3)} kcal in total')
+            st.caption(f'Window {i + 1} of {scheduler.nb_windows}')
 
-                    sleep(2)
-                    placeholder2.empty()
+        # the browser triggers the next rerun, the script never waits for it
+        wait = scheduler.next_update_in()
+        if wait is not None:
+            st_autorefresh(interval=max(int(wait * 1000), 100), key='replay_refresh')
 
+    # history, read from the rollups instead of predicting past windows again
+    with col4:
+        # calories from the current weight, minutes until a weight is entered
+        history = daily_activity(st.session_state.get('username', 'guest'), weight if weight > 0 else None)
+        if not history.empty:
+            st.subheader('Your activity per day' + (' (kcal)' if weight > 0 else ' (minutes)'))
+            history['minutes'] = history['seconds'] / 60
+            st.dataframe(history.pivot_table(index='day', columns='activity',
+                                             values='kcal' if weight > 0 else 'minutes', aggfunc='sum'))
 
 
 
@@ -243,15 +195,8 @@ def logged_in():
     st.write('You selected:', option)
 
     
-    if option == '🚉 public transport':
-         MET = 1
-         st.write('Your MET is :', MET)
-    elif option == '🧍standing':
-         MET = 1.5
-         st.write('Your MET is :', MET)
-    elif option == '🚶walking':
-         MET = 3.8
-         st.write('Your MET is :', MET)
+    MET = PLANNING_MET[option]
+    st.write('Your MET is :', MET)
     
 
     with st.expander("See explanation"):
@@ -261,7 +206,7 @@ def logged_in():
 
 
     # calculation
-    calories = MET * 3.5 * kilograms / 200 
+    calories = calories_per_minute(MET, kilograms)
     st.subheader("\n Calories burned per mintues: {} kcal".format(round(calories, 2)))
 
     calories1 = calories * time
@@ -306,14 +251,11 @@ if app_mode == 'Home':
     st.title('**Fitness Software using TMD dataset**')
     st.write("##")
 
-    # Gif from local file
-    file_ = open("C:\\Users\\ritth\\code\\Strive\\Google-Fit\\images\\gif_test.gif", "rb")
-    contents = file_.read()
-    data_url = base64.b64encode(contents).decode("utf-8")
-    file_.close()
+    # Gif from local file, encoded once per process (see assets.image_data_url)
+    data_url = image_data_url("C:\\Users\\ritth\\code\\Strive\\Google-Fit\\images\\gif_test.gif")
 
     st.markdown(
-        f'<img src="data:image/gif;base64,{data_url}" alt="test gif">',
+        f'<img src="{data_url}" alt="test gif">',
         unsafe_allow_html=True,
     )
 
@@ -327,12 +269,12 @@ if app_mode == 'Home':
     
     # Team Img
     st.title('**Our Team**')
-    st.image("Downloads\\Our_Team.PNG", use_column_width = True)
+    st.image(load_image("Downloads\\Our_Team.PNG", IMAGE_MAX_WIDTH), use_column_width = True)
 
     # First Plot - Missing value
     st.title('**Some results**')
     st.subheader('**Check null-values**')
-    st.image("Downloads\\miss_val.jpg", use_column_width = True)
+    st.image(load_image("Downloads\\miss_val.jpg", IMAGE_MAX_WIDTH), use_column_width = True)
     with st.expander('See explanation'):
          st.write('The white part on the plot represent the missing values.')
     st.write("##")
@@ -340,7 +282,7 @@ if app_mode == 'Home':
     
     # Second Plot - Missing value
     st.subheader('**Target/User**')
-    st.image("Downloads\\user_target.jpg", use_column_width = True)
+    st.image(load_image("Downloads\\user_target.jpg", IMAGE_MAX_WIDTH), use_column_width = True)
     with st.expander('See explanation'):
          st.write('We compared Target and User, we decided to take the U12 and U6 for the test set.')
     st.write("##")
@@ -348,9 +290,9 @@ if app_mode == 'Home':
 
     # Third Plot - Conf. Matrix
     st.subheader('**Confusion Matrix**')
-    #st.image("Downloads\\Table_ConfusionMatrix_rsz.png", use_column_width = True)
-    st.image("Downloads\\conf_matrix_new.jpg", use_column_width = True)
-    st.image("Downloads\\Table_ConfusionMatrix_rsz.png", use_column_width = True)
+    #st.image(load_image("Downloads\\Table_ConfusionMatrix_rsz.png", IMAGE_MAX_WIDTH), use_column_width = True)
+    st.image(load_image("Downloads\\conf_matrix_new.jpg", IMAGE_MAX_WIDTH), use_column_width = True)
+    st.image(load_image("Downloads\\Table_ConfusionMatrix_rsz.png", IMAGE_MAX_WIDTH), use_column_width = True)
     with st.expander('See explanation'):
          st.write('In the Confusion Matrix we compared people who are walking, still or in a bus/car/train.')
 
@@ -380,11 +322,11 @@ elif app_mode == 'Sign in':
         password = st.text_input("Password", type="password")
         
         if st.button("Login"):
-            create_usertable()
             result = login_user(username, password)
             
             if result:
                 st.success("You have logged in successfully")
+                st.session_state.username = username
 
                 if app_mode not in st.session_state:                  # redirect to logged in page
                     st.session_state.app_mode = 'Logged In'
@@ -439,7 +381,6 @@ elif app_mode == 'Create an Account':
         new_password = st.text_input("Password", type="password")
 
         if st.button("Signup"):
-            create_usertable()
             result1 = add_userdata(new_username, new_password)
             
             if result1:
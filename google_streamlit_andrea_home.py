@@ -3,10 +3,10 @@ import streamlit as st
 import pandas as pd
 from streamlit_option_menu import option_menu
 from streamlit_lottie import st_lottie
-import requests
-import sqlite3
+from assets import load_lottieurl, LOTTIE_URLS, load_image, IMAGE_MAX_WIDTH, image_data_url
+from user_store import create_usertable, add_userdata, login_user, view_all_users
+from calories import calories_per_minute, PLANNING_MET
 import streamlit.components.v1 as stc
-import base64
 
 
 
@@ -28,43 +28,17 @@ import base64
 
 
 
-# DB Management, to store data
-conn = sqlite3.connect('data.db')
-info_data = conn.cursor()
+# DB Management, to store data (schema is created once per server process)
+create_usertable()
 
 
-def create_usertable():
-    info_data.execute('CREATE TABLE IF NOT EXISTS userstable(username TEXT, password TEXT)')
 
-def add_userdata(username, password):
-    info_data.execute('INSERT INTO userstable(username, password) VALUES(?,?)', (username,password))
-conn.commit()
 
-def login_user(username,password):
-    info_data.execute('SELECT * FROM userstable WHERE username = ? AND password = ?', (username,password))
-    data = info_data.fetchall()
-    return data
-
-
-def view_all_users():
-    info_data.execute('SELECT * FROM userstable')
-    data = info_data.fetchall()
-    return data
-
-
-
-
-
-# app logo
-def load_lottieurl(url: str):
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None
-    return r.json()
 
+# app logo (animations are read from the local asset folder, see assets.py)
 with st.sidebar:
 
-    lottie_url = "https://assets3.lottiefiles.com/packages/lf20_sfpilpqw.json"
+    lottie_url = LOTTIE_URLS['logo']
     lottie_json = load_lottieurl(lottie_url)
     st_lottie(lottie_json)
 
@@ -72,15 +46,9 @@ with st.sidebar:
 
 
 # sign in 
-def load_lottieurl(url: str):
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None
-    return r.json()
-
-lottie_signin = load_lottieurl("https://assets9.lottiefiles.com/packages/lf20_mjlh3hcy.json")
-lottie_signup = load_lottieurl("https://assets5.lottiefiles.com/packages/lf20_q5pk6p1k.json")
-lottie_logout = load_lottieurl("https://assets1.lottiefiles.com/private_files/lf30_tapgoijy.json")
+lottie_signin = load_lottieurl(LOTTIE_URLS['signin'])
+lottie_signup = load_lottieurl(LOTTIE_URLS['signup'])
+lottie_logout = load_lottieurl(LOTTIE_URLS['logout'])
 
 
 
@@ -108,14 +76,11 @@ with st.sidebar:
 if app_mode == 'Home':
     st.title('**Fitness Software using TMD dataset**')
     
-    # Gif from local file
-    file_ = open("Images/gif_test.gif", "rb")
-    contents = file_.read()
-    data_url = base64.b64encode(contents).decode("utf-8")
-    file_.close()
+    # Gif from local file, encoded once per process (see assets.image_data_url)
+    data_url = image_data_url("Images/gif_test.gif")
 
     st.markdown(
-        f'<img src="data:image/gif;base64,{data_url}" alt="test gif">',
+        f'<img src="{data_url}" alt="test gif">',
         unsafe_allow_html=True,
     )
 
@@ -128,22 +93,22 @@ if app_mode == 'Home':
     
     # Team Img
     st.title('**Our Team**')
-    st.image("Images/Our_Team.PNG", use_column_width = True)
+    st.image(load_image("Images/Our_Team.PNG", IMAGE_MAX_WIDTH), use_column_width = True)
 
     # First Plot - Missing value
     st.title('**Some results**')
     st.subheader('**Check null-values**')
-    st.image("Images/miss_val.jpg", use_column_width = True)
+    st.image(load_image("Images/miss_val.jpg", IMAGE_MAX_WIDTH), use_column_width = True)
     st.markdown('The white part on the plot rappresent the missing values')
     
     # Second Plot - Missing value
     st.subheader('**Target/User**')
-    st.image("Images/user_target.jpg", use_column_width = True)
+    st.image(load_image("Images/user_target.jpg", IMAGE_MAX_WIDTH), use_column_width = True)
     st.markdown('We compared Target and User, we decided to take the U12 and u6 for the test set')
 
     # Third Plot - Conf. Matrix
     st.subheader('**Confusion Matrix**')
-    st.image("Images/conf_matrix_new.jpg", use_column_width = True)
+    st.image(load_image("Images/conf_matrix_new.jpg", IMAGE_MAX_WIDTH), use_column_width = True)
     st.markdown('In the confusion Matrix we compared people that are walking, still or in a bus/car/train')
 
     # it use to read and upload the file
@@ -178,7 +143,6 @@ elif app_mode == 'Sign in':
         password = st.text_input("Password", type="password")
 
         if st.button("Login"):
-            create_usertable()
             result = login_user(username, password)
             
             if result:
@@ -218,7 +182,6 @@ elif app_mode == 'Create an account':
         new_password = st.text_input("Password", type="password")
 
         if st.button("Signup"):
-            create_usertable()
             result1 = add_userdata(new_username, new_password)
             
 
@@ -283,65 +246,8 @@ elif app_mode == "LoggedIn":
 
 
 
-     if option == '💃 aerobics':
-         MET = 6.83
-         st.write('Your MET is :', MET)
-
-     elif option == '📺 watching TV':
-         MET = 1
-         st.write('Your MET is :', MET)
-
-     elif option == '⚾ baseball,softball':
-         MET = 5
-         st.write('Your MET is :', MET)
-
-     elif option == '⛹️ basketball':
-         MET = 8
-         st.write('Your MET is :', MET)
-
-     elif option == '🎱 billiards':
-         MET = 2.5
-         st.write('Your MET is :', MET)
-
-     elif option == '🧍standing':
-         MET = 1.5
-         st.write('Your MET is :', MET)
-
-     elif option == '🚣‍♂️ rowing' :
-         MET = 4.64
-         st.write('Your MET is :', MET)
-
-     elif option == '🚴 cycling':
-         MET = 9.5
-         st.write('Your MET is :', MET)
-
-     elif option == '🕺 dancing':
-         MET = 4.5
-         st.write('Your MET is :', MET)
-
-     elif option == '🎣 fishing':
-         MET = 4.5
-         st.write('Your MET is :', MET)
-     elif option == '🏌️ golfing':
-         MET = 3.75
-         st.write('Your MET is :', MET)
-     elif option == '😴 sleeping':
-         MET = 1
-         st.write('Your MET is :', MET)
-     elif option == '🏊 swimming':
-         MET = 8
-         st.write('Your MET is :', MET)
-     elif option == '🚶walking':
-         MET = 3.8
-         st.write('Your MET is :', MET)
-     elif option == '🚘 driving':
-         MET = 1.3
-         st.write('Your MET is :', MET)
-     elif option == '🏃 running':
-         MET = 9.8
-         st.write('Your MET is :', MET)
-     
-        
+     MET = PLANNING_MET[option]
+     st.write('Your MET is :', MET)
 
      with st.expander("See explanation"):
           st.write("""
@@ -353,7 +259,7 @@ elif app_mode == "LoggedIn":
 
 
     # calculation
-     calories = MET * 3.5 * kilograms / 200 
+     calories = calories_per_minute(MET, kilograms)
      st.subheader("\n Calories burned per mintues: {} kcal".format(round(calories, 2)))
 
      calories1 = calories * time
@@ -0,0 +1,155 @@
+# Dependencies
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.neighbors import KDTree, BallTree
+
+
+# Trees kept per imputer, each holds a copy of its training rows: with many missing patterns
+# an unbounded cache grows to many times the training set
+MAX_CACHED_TREES = 64
+
+
+# Tree based nearest neighbors imputation
+class TreeKNNImputer(BaseEstimator, TransformerMixin):
+    """Approximate `KNNImputer`: missing values are replaced by the mean of the `n_neighbors`
+    nearest training rows, found with a KD-tree or ball tree built on the columns observed in the
+    row to impute. Like `KNNImputer`, the donors of a column are the training rows where it is
+    observed (so a row never imputes itself), and columns with only missing values during fit
+    are dropped. Rows sharing the same missing pattern share one tree, queried for
+    2 * `n_neighbors` rows and again for more when a column has too few donors among them.
+    Rows are queried in chunks of `chunk_size`, and wider queries on fewer rows at once, so at
+    most `chunk_size` * 2 * `n_neighbors` neighbors are gathered at a time to bound memory. The
+    `MAX_CACHED_TREES` most recently used trees are kept for later calls.
+
+    Args:
+        n_neighbors (int, optional): Number of neighbors used to impute. Defaults to 5.
+        algorithm (str, optional): 'kd_tree' or 'ball_tree'. Defaults to 'kd_tree'.
+        leaf_size (int, optional): Leaf size of the trees. Defaults to 40.
+        chunk_size (int, optional): Number of rows queried at once. Defaults to 10000.
+    """
+
+    def __init__(self, n_neighbors=5, algorithm='kd_tree', leaf_size=40, chunk_size=10000):
+        self.n_neighbors = n_neighbors
+        self.algorithm = algorithm
+        self.leaf_size = leaf_size
+        self.chunk_size = chunk_size
+
+    def fit(self, X, y=None):
+        X = np.asarray(X, dtype=float)
+        if self.algorithm not in ('kd_tree', 'ball_tree'):
+            raise ValueError(f"algorithm should be 'kd_tree' or 'ball_tree', got {self.algorithm!r}")
+
+        self.valid_features_ = ~np.isnan(X).all(axis=0)
+        self.fit_X_ = X[:, self.valid_features_]
+        self.n_features_in_ = X.shape[1]
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            self.means_ = np.nanmean(self.fit_X_, axis=0)
+
+        self._fit_missing = np.isnan(self.fit_X_)
+        self._trees = OrderedDict()
+
+        return self
+
+    def _tree(self, observed):
+        # tree over the training rows complete on the `observed` columns, the least recently
+        # used trees are dropped beyond `MAX_CACHED_TREES`
+        key = observed.tobytes()
+        if key in self._trees:
+            self._trees.move_to_end(key)
+        else:
+            donors = np.flatnonzero(~self._fit_missing[:, observed].any(axis=1))
+            tree = None
+            if len(donors):
+                tree_class = KDTree if self.algorithm == 'kd_tree' else BallTree
+                tree = tree_class(self.fit_X_[np.ix_(donors, observed)], leaf_size=self.leaf_size)
+            self._trees[key] = (tree, donors)
+            if len(self._trees) > MAX_CACHED_TREES:
+                self._trees.popitem(last=False)
+
+        return self._trees[key]
+
+    def transform(self, X):
+        X = np.array(X, dtype=float)[:, self.valid_features_]
+        missing = np.isnan(X)
+
+        to_impute = np.flatnonzero(missing.any(axis=1))
+        if not len(to_impute):
+            return X
+
+        patterns, pattern_of_row = np.unique(missing[to_impute], axis=0, return_inverse=True)
+        pattern_of_row = pattern_of_row.ravel()
+
+        for p, pattern in enumerate(patterns):
+            rows = to_impute[pattern_of_row == p]
+            observed = ~pattern
+            columns = np.flatnonzero(pattern)
+            tree, donors = self._tree(observed) if observed.any() else (None, [])
+
+            # nothing to compare with, fall back to the column means
+            if tree is None:
+                X[np.ix_(rows, pattern)] = self.means_[pattern]
+                continue
+
+            # neighbors used per column: the nearest rows of the tree where the column is observed
+            donor_values = self.fit_X_[np.ix_(donors, columns)]
+            k = np.minimum(self.n_neighbors, (~np.isnan(donor_values)).sum(axis=0))
+            budget = self.chunk_size * 2 * self.n_neighbors
+            for start in range(0, len(rows), self.chunk_size):
+                chunk = rows[start:start + self.chunk_size]
+                queries = X[np.ix_(chunk, observed)]
+                values = np.empty((len(chunk), len(columns)))
+
+                # query more neighbors for the rows missing donors, up to all rows of the tree,
+                # on fewer rows at once so the gathered neighbors stay within the budget
+                pending = np.arange(len(chunk))
+                nb_queried = min(2 * self.n_neighbors, len(donors))
+                while len(pending):
+                    batch_size = max(budget // nb_queried, 1)
+                    short = []
+                    for batch in (pending[i:i + batch_size] for i in range(0, len(pending), batch_size)):
+                        _, ind = tree.query(queries[batch], k=nb_queried)
+                        neighbors = donor_values[ind]
+                        used = ~np.isnan(neighbors)
+                        used &= np.cumsum(used, axis=1) <= self.n_neighbors
+                        counts = used.sum(axis=1)
+                        with np.errstate(invalid='ignore', divide='ignore'):
+                            values[batch] = np.where(used, neighbors, 0).sum(axis=1) / counts
+                        short.append(batch[(counts < k).any(axis=1)])
+
+                    if nb_queried == len(donors):
+                        break
+                    pending = np.concatenate(short)
+                    nb_queried = min(4 * nb_queried, len(donors))
+
+                X[np.ix_(chunk, columns)] = np.where(k > 0, values, self.means_[columns])
+
+        return X
+
+
+# Group means imputation
+def impute_group_means(dataset, by=('user', 'target')):
+    """Fill missing values of numerical columns with the mean of their (`user`, `target`) group,
+    then with the column mean when a whole group is missing. Meant for labelled data cleaning, the
+    group columns are not needed at prediction time.
+
+    Args:
+        dataset (Pandas DataFrame): Dataset to impute, must contain the `by` columns
+        by (tuple of str, optional): Columns defining the groups. Defaults to ('user', 'target').
+
+    Returns:
+        Pandas DataFrame: Imputed dataset
+    """
+    by = list(by)
+    numerical = [c for c in dataset.select_dtypes('number').columns if c not in by]
+
+    dataset = dataset.copy()
+    group_means = dataset.groupby(by, sort=False, observed=True)[numerical].transform('mean')
+    dataset[numerical] = dataset[numerical].fillna(group_means).fillna(dataset[numerical].mean())
+
+    return dataset
@@ -0,0 +1,308 @@
+# Dependencies
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+
+import pandas as pd
+import numpy as np
+
+from model_registry import load_model
+from utilities import select_columns
+
+
+# Features expected by the deployed model (see `logged_in` in google_streamlit.py)
+COLUMNS_TO_KEEP = 'accelerometer|sound|gyroscope'
+
+
+class LatencyStats:
+    """Keeps the last `maxlen` latencies (in seconds) and reports their percentiles
+
+    Args:
+        maxlen (int, optional): Number of latencies kept. Defaults to 10000.
+    """
+
+    def __init__(self, maxlen=10000):
+        self._latencies = deque(maxlen=maxlen)
+        self.count = 0
+
+    def add(self, latency):
+        self._latencies.append(latency)
+        self.count += 1
+
+    def summary(self):
+        """dict: number of requests, p50 and p99 latency in milliseconds"""
+        if not self._latencies:
+            return {'count': 0, 'p50_ms': None, 'p99_ms': None}
+
+        p50, p99 = np.percentile(np.fromiter(self._latencies, dtype=float), [50, 99]) * 1000
+        return {'count': self.count, 'p50_ms': round(float(p50), 3), 'p99_ms': round(float(p99), 3)}
+
+
+class MicroBatcher:
+    """Coalesces concurrent prediction requests: rows queued within `max_wait` seconds of the
+    first one (up to `max_batch_size` rows) are predicted with a single `predict` call, run in
+    a worker thread so the event loop keeps accepting requests.
+
+    Args:
+        predict (callable): Function predicting a 2D numpy array
+        max_batch_size (int, optional): Maximum number of rows per call. Defaults to 256.
+        max_wait (float, optional): Maximum time in seconds a request waits for others. Defaults to 0.005.
+    """
+
+    def __init__(self, predict, max_batch_size=256, max_wait=0.005):
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.rows = 0
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, rows):
+        """Predict `rows` (2D numpy array) together with the other pending requests"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((rows, future))
+
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            nb_rows = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+
+            while nb_rows < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                nb_rows += len(item[0])
+
+            X = np.concatenate([rows for rows, _ in batch])
+            try:
+                preds = await loop.run_in_executor(None, self.predict, X)
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+
+            self.batches += 1
+            self.rows += len(X)
+
+            start = 0
+            for rows, future in batch:
+                if not future.done():
+                    future.set_result(preds[start:start + len(rows)])
+                start += len(rows)
+
+
+class InferenceServer:
+    """Minimal HTTP/JSON server scoring 5-second sensor windows with a joblib pipeline.
+
+    Endpoints:
+        POST /predict: {"rows": [...]} where each row is a list of feature values in `columns`
+                       order or a {column: value} dict (missing or null values become NaN).
+                       Returns {"predictions": [...]}.
+        GET /stats: request count, p50/p99 latency and batching statistics
+        GET /health: {"status": "ok"}
+
+    Args:
+        model_path (str): joblib file of the fitted pipeline
+        columns (list of str): Feature columns expected by the model
+        max_batch_size (int, optional): See `MicroBatcher`. Defaults to 256.
+        max_wait (float, optional): See `MicroBatcher`. Defaults to 0.005.
+    """
+
+    def __init__(self, model_path, columns, max_batch_size=256, max_wait=0.005):
+        self.model = load_model(model_path)
+        self.columns = list(columns)
+        self.batcher = MicroBatcher(self._predict, max_batch_size, max_wait)
+        self.latency = LatencyStats()
+
+    def _predict(self, X):
+        return self.model.predict(X)
+
+    def _to_array(self, rows):
+        if not isinstance(rows, list):
+            raise TypeError('rows should be a list')
+        is_dict = [isinstance(row, dict) for row in rows]
+        if any(is_dict):
+            if not all(is_dict):
+                raise ValueError('rows should be all lists or all objects')
+            rows = [[row.get(c) for c in self.columns] for row in rows]
+        X = np.array(rows, dtype=float)  # None -> nan
+        if X.ndim != 2 or X.shape[1] != len(self.columns):
+            raise ValueError(f'Expected rows of {len(self.columns)} values')
+
+        return X
+
+    async def _route(self, method, path, body):
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok'}
+
+        if method == 'GET' and path == '/stats':
+            stats = self.latency.summary()
+            stats['batches'] = self.batcher.batches
+            stats['mean_batch_size'] = self.batcher.rows / max(self.batcher.batches, 1)
+            return 200, stats
+
+        if method == 'POST' and path == '/predict':
+            t0 = time.perf_counter()
+            try:
+                X = self._to_array(json.loads(body)['rows'])
+            except (ValueError, KeyError, TypeError) as error:
+                return 400, {'error': str(error)}
+
+            try:
+                preds = await self.batcher.submit(X)
+            except Exception as error:
+                return 500, {'error': f'Prediction failed: {error}'}
+            self.latency.add(time.perf_counter() - t0)
+            return 200, {'predictions': preds.tolist()}
+
+        return 404, {'error': f'{method} {path} not found'}
+
+    async def _respond(self, writer, status, payload, close=False):
+        data = json.dumps(payload).encode('utf-8')
+        headers = (f'HTTP/1.1 {status} {"OK" if status == 200 else "Error"}\r\n'
+                   f'Content-Type: application/json\r\n'
+                   f'Content-Length: {len(data)}\r\n')
+        if close:
+            headers += 'Connection: close\r\n'
+        writer.write((headers + '\r\n').encode('latin-1') + data)
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        # HTTP/1.1 with keep-alive, bodies sized by Content-Length. A request that can't be
+        # parsed gets a 400 and the connection is closed, the next request can't be located.
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'Malformed request line'}, close=True)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length', 0))
+                    if length < 0:
+                        raise ValueError
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'Invalid Content-Length'}, close=True)
+                    break
+
+                body = await reader.readexactly(length)
+                status, payload = await self._route(method, path, body)
+                await self._respond(writer, status, payload)
+
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8000):
+        """Start the server and run until cancelled"""
+        self.batcher.start()
+        server = await asyncio.start_server(self._handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+# Load generator
+async def _client(host, port, rows, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for row in rows:
+            body = json.dumps({'rows': [row]}).encode('utf-8')
+            t0 = time.perf_counter()
+            writer.write(f'POST /predict HTTP/1.1\r\nHost: {host}\r\n'
+                         f'Content-Type: application/json\r\n'
+                         f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body)
+            await writer.drain()
+
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':')[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - t0)
+    finally:
+        writer.close()
+
+
+async def load_test(host='127.0.0.1', port=8000, csv_path='example_file_user.csv',
+                    columns_to_keep=COLUMNS_TO_KEEP, concurrency=32, nb_requests=5000):
+    """Replay the rows of `csv_path` as single-window requests from `concurrency` clients
+
+    Args:
+        host (str, optional): Server address. Defaults to '127.0.0.1'.
+        port (int, optional): Server port. Defaults to 8000.
+        csv_path (str, optional): Windows to replay. Defaults to 'example_file_user.csv'.
+        columns_to_keep (regex expression, str, optional): Feature columns. Defaults to `COLUMNS_TO_KEEP`.
+        concurrency (int, optional): Number of concurrent clients. Defaults to 32.
+        nb_requests (int, optional): Total number of requests. Defaults to 5000.
+
+    Returns:
+        dict: Requests per second and client-side p50/p99 latency in milliseconds
+    """
+    data = select_columns(pd.read_csv(csv_path), columns_to_keep)
+    rows = [[None if np.isnan(v) else v for v in row] for row in data.to_numpy(dtype=float).tolist()]
+    rows = [rows[i % len(rows)] for i in range(nb_requests)]
+
+    latencies = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, rows[i::concurrency], latencies)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    return {'requests': len(latencies), 'requests_per_second': len(latencies) / elapsed,
+            'p50_ms': float(p50), 'p99_ms': float(p99)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the activity model or benchmark the server')
+    parser.add_argument('command', choices=['serve', 'bench'])
+    parser.add_argument('--model', default='theo.joblib')
+    parser.add_argument('--csv', default='example_file_user.csv', help='windows replayed by bench, also gives the feature columns')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=5)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        columns = select_columns(pd.read_csv(args.csv, nrows=1), COLUMNS_TO_KEEP).columns
+        server = InferenceServer(args.model, columns, args.max_batch_size, args.max_wait_ms / 1000)
+        asyncio.run(server.serve(args.host, args.port))
+    else:
+        print(asyncio.run(load_test(args.host, args.port, args.csv, concurrency=args.concurrency,
+                                    nb_requests=args.requests)))
@@ -1,5 +1,6 @@
 
 from utilities import *
+from dataset_cache import load_dataset
 import pandas as pd
 
 
@@ -10,7 +11,7 @@ from sklearn.neural_network import MLPClassifier
 from sklearn.linear_model import SGDClassifier
 
 # Load data
-data = pd.read_csv('data/dataset_5secondWindow.csv')
+data = load_dataset('data/dataset_5secondWindow.csv')
 print('raw_data: ', data.shape)
 
 df = data.copy()
@@ -0,0 +1,64 @@
+# Dependencies
+import hashlib
+import os
+import threading
+import warnings
+
+import joblib
+
+
+# Models loaded in this process: absolute path -> (file signature, model)
+_models = {}
+_lock = threading.Lock()
+
+
+def _signature(path, use_hash):
+    # modification time and size, plus content hash when asked
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if use_hash:
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(block)
+        signature += (sha1.hexdigest(),)
+
+    return signature
+
+
+# Load a model once per process
+def load_model(path, mmap_mode='r', use_hash=False):
+    """Load a joblib model once per process and share it between all callers (every Streamlit
+    session of the server). The model is loaded again only when the file changes. Numpy arrays
+    of uncompressed joblib files are memory-mapped instead of copied in memory.
+
+    Args:
+        path (str): Path to the joblib file
+        mmap_mode (str, optional): Memory-mapping mode passed to `joblib.load`, None to disable. Defaults to 'r'.
+        use_hash (bool, optional): Also compare the file content hash, not only its modification time and size. Defaults to False.
+
+    Returns:
+        sklearn estimator: The loaded model
+    """
+    path = os.path.abspath(path)
+    signature = _signature(path, use_hash)
+
+    with _lock:
+        cached = _models.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        with warnings.catch_warnings():
+            # compressed files can't be memory-mapped, joblib then loads them normally
+            warnings.filterwarnings('ignore', message='.*mmap.*')
+            model = joblib.load(path, mmap_mode=mmap_mode)
+
+        _models[path] = (signature, model)
+
+    return model
+
+
+def clear_models():
+    """Forget every loaded model"""
+    with _lock:
+        _models.clear()
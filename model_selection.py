@@ -0,0 +1,131 @@
+# Dependencies
+import time
+from math import ceil, log
+
+import pandas as pd
+import numpy as np
+from joblib import Parallel, delayed
+
+from sklearn.base import clone
+from sklearn.model_selection import ParameterGrid
+
+from utilities import CACHE_DIR, make_folds, preprocess_folds, _scores
+
+
+def expand_candidates(candidates):
+    """Turn models and parameter grids into one named estimator per setting
+
+    Args:
+        candidates (dict): Name -> estimator, or name -> (estimator, param_grid) with a grid as accepted by `GridSearchCV`
+
+    Returns:
+        dict: Name (with the parameters of the setting) -> unfitted estimator
+    """
+    expanded = {}
+    for name, candidate in candidates.items():
+        if not isinstance(candidate, tuple):
+            expanded[name] = clone(candidate)
+            continue
+
+        estimator, param_grid = candidate
+        for params in ParameterGrid(param_grid):
+            label = ' '.join(f'{k}={v}' for k, v in params.items())
+            expanded[f'{name} {label}' if label else name] = clone(estimator).set_params(**params)
+
+    return expanded
+
+
+# Fit and score one candidate on one fold (runs inside a worker)
+def _race(name, model, X_train, y_train, X_test, y_test):
+    try:
+        t0 = time.time()
+        model.fit(X_train, y_train)
+        train_time = time.time() - t0
+
+        t0 = time.time()
+        preds = model.predict(X_test)
+        pred_time = time.time() - t0
+    except (ValueError, TypeError, np.linalg.LinAlgError):
+        # invalid setting (e.g. out of range parameter): it loses the race
+        return {'name': name, 'balanced_accuracy': np.nan, 'f1_score': np.nan, 'precision': np.nan,
+                'recall': np.nan, 'training_time': np.nan, 'predicting_time': np.nan}
+
+    return {'name': name, **_scores(y_test, preds), 'training_time': train_time, 'predicting_time': pred_time}
+
+
+def successive_halving(candidates, X, y, cv=5, groups=None, factor=3, min_fraction=None,
+                       imputation='knn', memory=CACHE_DIR, n_jobs=-1, random_state=0):
+    """Race candidate models (and parameter settings) on growing fractions of the training data.
+    Every round fits the remaining candidates on `fraction` of the training rows of every fold,
+    keeps the best 1/`factor` by mean balanced accuracy on the test folds and multiplies the
+    fraction by `factor`, until one candidate is left or the whole training folds are used.
+
+    Folds are computed and preprocessed once (see `preprocess_folds`) and reused by every
+    round and candidate; each round samples the same row order so fractions are nested.
+
+    Args:
+        candidates (dict): Name -> estimator, or name -> (estimator, param_grid), see `expand_candidates`
+        X (Pandas DataFrame or numpy array): Features
+        y (Pandas Series or numpy array): Target
+        cv (int, optional): Number of folds. Defaults to 5.
+        groups (array-like, optional): User of every row to build user-based folds, see `make_folds`. Defaults to None.
+        factor (int, optional): Fraction of candidates dropped and data growth per round. Defaults to 3.
+        min_fraction (float, optional): Fraction of the training rows of the first round, None to reach all rows in the last round. Defaults to None.
+        imputation (str, optional): See `make_preprocessor`. Defaults to 'knn'.
+        memory (str or joblib.Memory, optional): Cache of the preprocessed folds, None to disable caching. Defaults to `CACHE_DIR`.
+        n_jobs (int, optional): Number of worker processes, -1 for all cores. Defaults to -1.
+        random_state (int, optional): Seed of the folds and of the row sampling. Defaults to 0.
+
+    Returns:
+        Pandas Dataframe: Same columns as `perfomance` (averaged over the folds) plus mean_score, std_score,
+                          the round a candidate reached and its number of training rows, best candidates first
+    """
+    models = expand_candidates(candidates)
+    y = np.asarray(y)
+    folds = preprocess_folds(X, y, make_folds(y, cv, groups, random_state),
+                             imputation=imputation, memory=memory, n_jobs=n_jobs)
+
+    rng = np.random.default_rng(random_state)
+    orders = [rng.permutation(len(y_train)) for _, y_train, _, _ in folds]
+
+    if min_fraction is None:
+        nb_rounds = ceil(log(len(models)) / log(factor)) if len(models) > 1 else 0
+        min_fraction = float(factor) ** -nb_rounds
+
+    alive = list(models)
+    fraction = min_fraction
+    records = {}
+    for round_ in range(len(models)):
+        fraction = min(fraction, 1.0)
+
+        outputs = Parallel(n_jobs=n_jobs, max_nbytes='1M', mmap_mode='r')(
+            delayed(_race)(name, clone(models[name]),
+                           X_train[order[:max(int(len(order) * fraction), 1)]],
+                           y_train[order[:max(int(len(order) * fraction), 1)]],
+                           X_test, y_test)
+            for name in alive
+            for (X_train, y_train, X_test, y_test), order in zip(folds, orders))
+
+        scores = pd.DataFrame.from_records(outputs)
+        summary = scores.groupby('name', sort=False).mean()
+        summary['mean_score'] = summary['balanced_accuracy']
+        summary['std_score'] = scores.groupby('name', sort=False)['balanced_accuracy'].std(ddof=0)
+        summary['round'] = round_
+        summary['n_samples'] = int(np.mean([max(int(len(order) * fraction), 1) for order in orders]))
+        for name, row in summary.iterrows():
+            records[name] = {'name': name, **row.to_dict()}
+
+        if len(alive) == 1 or fraction >= 1:
+            break
+
+        ranking = summary['mean_score'].sort_values(ascending=False, na_position='last')
+        alive = list(ranking.index[:ceil(len(alive) / factor)])
+        fraction *= factor
+
+    results = pd.DataFrame.from_records(list(records.values()))
+    results = results[['name', 'mean_score', 'std_score', 'balanced_accuracy', 'f1_score', 'precision',
+                       'recall', 'training_time', 'predicting_time', 'round', 'n_samples']]
+    results = results.astype({'round': int, 'n_samples': int})
+    results.index = [0] * len(results)
+
+    return results.sort_values(by=['round', 'mean_score'], ascending=False)
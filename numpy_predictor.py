@@ -0,0 +1,322 @@
+# Dependencies
+import json
+
+import numpy as np
+from scipy.special import ndtri
+
+
+# Same bound as sklearn's QuantileTransformer
+BOUNDS_THRESHOLD = 1e-7
+
+
+# Exporters: fitted sklearn step -> (kind, dict of numpy arrays)
+def _export_knn_imputer(step):
+    if not (isinstance(step.missing_values, float) and np.isnan(step.missing_values)):
+        raise NotImplementedError('Only NaN missing values are supported')
+    if step.weights != 'uniform' or step.metric != 'nan_euclidean' or step.add_indicator:
+        raise NotImplementedError('Only uniform weights and nan_euclidean metric are supported')
+
+    fit_X = np.asarray(step._fit_X, dtype=float)
+    with np.errstate(invalid='ignore'):
+        means = np.nanmean(np.where(step._mask_fit_X, np.nan, fit_X), axis=0)
+
+    return 'knn_imputer', {'fit_X': fit_X, 'means': means,
+                           'valid': np.asarray(step._valid_mask, dtype=bool),
+                           'n_neighbors': np.array(step.n_neighbors)}
+
+
+def _export_simple_imputer(step):
+    if step.add_indicator:
+        raise NotImplementedError('Missing indicators are not supported')
+    statistics = np.asarray(step.statistics_, dtype=float)
+
+    return 'simple_imputer', {'statistics': statistics, 'valid': ~np.isnan(statistics)}
+
+
+def _export_scaler(step):
+    n_features = step.n_features_in_
+    mean = step.mean_ if step.with_mean else np.zeros(n_features)
+    scale = step.scale_ if step.with_std else np.ones(n_features)
+
+    return 'scaler', {'mean': np.asarray(mean, dtype=float), 'scale': np.asarray(scale, dtype=float)}
+
+
+def _export_quantile_transformer(step):
+    return 'quantile', {'quantiles': np.asarray(step.quantiles_, dtype=float),
+                        'references': np.asarray(step.references_, dtype=float),
+                        'normal': np.array(step.output_distribution == 'normal')}
+
+
+def _export_trees(estimators):
+    # all trees in flat struct-of-arrays node tables, children indices made global
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        leaf = tree.children_left == -1
+        feature.append(np.where(leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        left.append(np.where(leaf, -1, tree.children_left + offset))
+        right.append(np.where(leaf, -1, tree.children_right + offset))
+        value.append(tree.value[:, 0, :])
+        roots.append(offset)
+        offset += tree.node_count
+
+    return {'feature': np.concatenate(feature).astype(np.intp),
+            'threshold': np.concatenate(threshold),
+            'left': np.concatenate(left).astype(np.intp),
+            'right': np.concatenate(right).astype(np.intp),
+            'value': np.concatenate(value),
+            'roots': np.array(roots, dtype=np.intp)}
+
+
+def _export_forest(model):
+    estimators = getattr(model, 'estimators_', [model])
+    arrays = _export_trees(estimators)
+    # per node class probabilities (older sklearn versions store counts)
+    arrays['value'] = arrays['value'] / arrays['value'].sum(axis=1, keepdims=True)
+    arrays['classes'] = np.asarray(model.classes_)
+
+    return 'forest', arrays
+
+
+def _export_gradient_boosting(model, X_sample):
+    estimators = model.estimators_  # shape (n_stages, n_trees_per_stage)
+    arrays = _export_trees(estimators.ravel())
+    arrays['value'] = arrays['value'][:, 0]
+    arrays['n_trees_per_stage'] = np.array(estimators.shape[1])
+    arrays['learning_rate'] = np.array(model.learning_rate)
+    arrays['classes'] = np.asarray(model.classes_)
+
+    # the initial raw prediction is constant: recover it from the public decision function
+    X_sample = np.asarray(X_sample[:1], dtype=np.float32)
+    decision = np.asarray(model.decision_function(X_sample), dtype=float).reshape(1, -1)[0]
+    arrays['init'] = decision - arrays['learning_rate'] * _sum_stages(arrays, X_sample)[0]
+
+    return 'gradient_boosting', arrays
+
+
+_EXPORTERS = {'KNNImputer': _export_knn_imputer,
+              'SimpleImputer': _export_simple_imputer,
+              'StandardScaler': _export_scaler,
+              'QuantileTransformer': _export_quantile_transformer,
+              'DecisionTreeClassifier': _export_forest,
+              'RandomForestClassifier': _export_forest,
+              'ExtraTreesClassifier': _export_forest}
+
+
+# Numpy evaluation of every kind of step
+def _knn_impute(arrays, X, chunk_size=256):
+    fit_X, means, valid = arrays['fit_X'], arrays['means'], arrays['valid']
+    n_neighbors = int(arrays['n_neighbors'])
+    fit_present = ~np.isnan(fit_X)
+    fit_filled = np.where(fit_present, fit_X, 0)
+
+    X = X.copy()
+    missing = np.isnan(X)
+    rows = np.flatnonzero(missing[:, valid].any(axis=1))
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        present = ~missing[chunk]
+        filled = np.where(present, X[chunk], 0)
+
+        # nan_euclidean distances: squared differences on coordinates present in both rows,
+        # scaled up by n_features / n_common
+        sq = (filled ** 2) @ fit_present.T.astype(float) + present.astype(float) @ (fit_filled ** 2).T \
+            - 2 * filled @ fit_filled.T
+        common = present.astype(float) @ fit_present.T.astype(float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dist = np.sqrt(np.maximum(sq, 0) * X.shape[1] / common)
+        dist[common == 0] = np.nan
+
+        for col in np.flatnonzero(valid):
+            receivers = np.flatnonzero(missing[chunk, col])
+            if not len(receivers):
+                continue
+            donors = np.flatnonzero(fit_present[:, col])
+            sub = dist[np.ix_(receivers, donors)]
+            k = min(n_neighbors, len(donors))
+
+            nearest = np.argpartition(np.where(np.isnan(sub), np.inf, sub), k - 1, axis=1)[:, :k]
+            nearest_dist = np.take_along_axis(sub, nearest, axis=1)
+            weights = (~np.isnan(nearest_dist)).astype(float)
+            values = fit_X[donors[nearest], col]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                imputed = (np.where(weights > 0, values, 0) * weights).sum(axis=1) / weights.sum(axis=1)
+
+            X[chunk[receivers], col] = np.where(np.isnan(imputed), means[col], imputed)
+
+    return X[:, valid]
+
+
+def _quantile_transform(arrays, X):
+    quantiles, references = arrays['quantiles'], arrays['references']
+    normal = bool(arrays['normal'])
+    X = X.copy()
+
+    for j in range(X.shape[1]):
+        column, q = X[:, j], quantiles[:, j]
+        with np.errstate(invalid='ignore'):
+            if normal:
+                lower = column - BOUNDS_THRESHOLD < q[0]
+                upper = column + BOUNDS_THRESHOLD > q[-1]
+            else:
+                lower = column == q[0]
+                upper = column == q[-1]
+
+        finite = ~np.isnan(column)
+        values = column[finite]
+        column[finite] = 0.5 * (np.interp(values, q, references)
+                                - np.interp(-values, -q[::-1], -references[::-1]))
+        column[upper] = 1
+        column[lower] = 0
+
+        if normal:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                column = np.clip(ndtri(column),
+                                 ndtri(BOUNDS_THRESHOLD - np.spacing(1)),
+                                 ndtri(1 - (BOUNDS_THRESHOLD - np.spacing(1))))
+        X[:, j] = column
+
+    return X
+
+
+def _leaves(arrays, X):
+    # walk every (row, tree) pair down its tree at once, one level per iteration
+    X = X.astype(np.float32).astype(float)  # sklearn trees compare float32 features
+    nb_rows, nb_trees = len(X), len(arrays['roots'])
+    nodes = np.broadcast_to(arrays['roots'], (nb_rows, nb_trees)).copy()
+    row_index = np.arange(nb_rows)[:, None]
+
+    left, right = arrays['left'], arrays['right']
+    active = left[nodes] != -1
+    while active.any():
+        go_left = X[row_index, arrays['feature'][nodes]] <= arrays['threshold'][nodes]
+        nodes = np.where(active, np.where(go_left, left[nodes], right[nodes]), nodes)
+        active = left[nodes] != -1
+
+    return nodes
+
+
+def _sum_stages(arrays, X):
+    n_trees_per_stage = int(arrays['n_trees_per_stage'])
+    values = arrays['value'][_leaves(arrays, X)]
+
+    return values.reshape(len(X), -1, n_trees_per_stage).sum(axis=1)
+
+
+def _predict_forest(arrays, X):
+    proba = arrays['value'][_leaves(arrays, X)].mean(axis=1)
+
+    return arrays['classes'][proba.argmax(axis=1)]
+
+
+def _predict_gradient_boosting(arrays, X):
+    raw = arrays['init'] + arrays['learning_rate'] * _sum_stages(arrays, X)
+    if raw.shape[1] == 1:
+        return arrays['classes'][(raw[:, 0] > 0).astype(int)]
+
+    return arrays['classes'][raw.argmax(axis=1)]
+
+
+_TRANSFORMS = {'knn_imputer': _knn_impute,
+               'simple_imputer': lambda a, X: np.where(np.isnan(X), a['statistics'], X)[:, a['valid']],
+               'scaler': lambda a, X: (X - a['mean']) / a['scale'],
+               'quantile': _quantile_transform}
+
+_PREDICTS = {'forest': _predict_forest,
+             'gradient_boosting': _predict_gradient_boosting}
+
+
+class NumpyPredictor:
+    """Fitted pipeline compiled to flat numpy arrays, predicting without sklearn
+
+    Args:
+        steps (list): (kind, dict of numpy arrays) of the preprocessing steps then the model
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+
+    def predict(self, X):
+        """Predict the rows of `X` (2D array-like, NaN for missing values)
+
+        Returns:
+            numpy array: One predicted class per row
+        """
+        X = np.array(X, dtype=float, ndmin=2)
+        for kind, arrays in self.steps[:-1]:
+            X = _TRANSFORMS[kind](arrays, X)
+
+        kind, arrays = self.steps[-1]
+        return _PREDICTS[kind](arrays, X)
+
+    def save(self, path):
+        """Save all arrays in a single .npz file (no pickle)"""
+        # text class labels are stored as fixed-width strings
+        arrays = {f'{i}/{name}': values.astype(str) if values.dtype == object else values
+                  for i, (_, step) in enumerate(self.steps) for name, values in step.items()}
+        kinds = json.dumps([kind for kind, _ in self.steps])
+        np.savez(path, __kinds__=np.array(kinds), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Load a predictor saved with `save`"""
+        with np.load(path, allow_pickle=False) as f:
+            kinds = json.loads(str(f['__kinds__']))
+            steps = [(kind, {}) for kind in kinds]
+            for key in f.files:
+                if key != '__kinds__':
+                    i, name = key.split('/', 1)
+                    steps[int(i)][1][name] = f[key]
+
+        return cls(steps)
+
+
+# Export
+def export_pipeline(pipe, X_sample=None):
+    """Compile a fitted pipeline of imputer (KNN or simple), scaler, quantile transformer and
+    tree-based classifier (decision tree, random forest, extra trees or gradient boosting) into
+    a `NumpyPredictor`
+
+    Args:
+        pipe (sklearn Pipeline or estimator): Fitted pipeline
+        X_sample (array-like, optional): At least one input row, needed for gradient boosting. Defaults to None.
+
+    Returns:
+        NumpyPredictor: Predictor equivalent to `pipe.predict`
+    """
+    steps = [step for _, step in pipe.steps] if hasattr(pipe, 'steps') else [pipe]
+    exported = []
+    for i, step in enumerate(steps):
+        name = type(step).__name__
+        if name == 'GradientBoostingClassifier':
+            if X_sample is None:
+                raise ValueError('X_sample is needed to export gradient boosting')
+            sample = np.array(X_sample, dtype=float, ndmin=2)
+            for kind, arrays in exported:
+                sample = _TRANSFORMS[kind](arrays, sample)
+            exported.append(_export_gradient_boosting(step, sample))
+        elif name in _EXPORTERS:
+            exported.append(_EXPORTERS[name](step))
+        else:
+            raise NotImplementedError(f'{name} (step {i}) cannot be exported')
+
+    return NumpyPredictor(exported)
+
+
+def check_parity(pipe, predictor, X):
+    """Fraction of the rows of `X` where `predictor` and `pipe.predict` agree
+
+    Args:
+        pipe (sklearn Pipeline): Fitted pipeline
+        predictor (NumpyPredictor): Its export
+        X (array-like): Rows to compare on
+
+    Returns:
+        float: 1.0 when all predictions are identical
+    """
+    X = np.asarray(X, dtype=float)
+
+    return float(np.mean(pipe.predict(X) == predictor.predict(X)))
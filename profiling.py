@@ -0,0 +1,161 @@
+# Dependencies
+import warnings
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import numpy as np
+
+from dataset_cache import load_dataset
+
+
+# Single pass statistics
+def profile_chunks(chunks, quantiles=(0.25, 0.5, 0.75), sample_size=10000, random_state=0):
+    """Compute per-column statistics in one pass over an iterable of DataFrames with the same
+    columns. Null counts, min, max, mean and std are exact (means and variances are merged chunk
+    by chunk), quantiles are estimated on a uniform random sample of `sample_size` rows.
+    Statistics other than null counts are NaN for non-numerical columns.
+
+    Args:
+        chunks (iterable of Pandas DataFrame): Chunks of the dataset
+        quantiles (tuple of float, optional): Quantiles to estimate. Defaults to (0.25, 0.5, 0.75).
+        sample_size (int, optional): Number of sampled rows for the quantiles. Defaults to 10000.
+        random_state (int, optional): Seed of the sampling. Defaults to 0.
+
+    Returns:
+        Pandas DataFrame: One row per column with rows, null_count, null_percent, min, max, mean, std and the quantiles
+    """
+    rng = np.random.default_rng(random_state)
+    columns = None
+
+    for chunk in chunks:
+        if columns is None:
+            columns = chunk.columns
+            numerical = np.array([pd.api.types.is_numeric_dtype(chunk[c]) for c in columns])
+            nb_numerical = numerical.sum()
+
+            rows = 0
+            nulls = np.zeros(len(columns), dtype=np.int64)
+            count = np.zeros(nb_numerical)
+            mean = np.zeros(nb_numerical)
+            m2 = np.zeros(nb_numerical)
+            mins = np.full(nb_numerical, np.nan)
+            maxs = np.full(nb_numerical, np.nan)
+            sample = np.empty((0, nb_numerical))
+            keys = np.empty(0)
+
+        rows += len(chunk)
+        nulls += chunk.isna().sum().to_numpy()
+
+        X = chunk.iloc[:, np.flatnonzero(numerical)].to_numpy(dtype=float)
+        observed = ~np.isnan(X)
+
+        # merge mean and sum of squared deviations of this chunk (Chan et al.)
+        chunk_count = observed.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            chunk_mean = np.where(observed, X, 0).sum(axis=0) / chunk_count
+            chunk_m2 = np.where(observed, (X - chunk_mean) ** 2, 0).sum(axis=0)
+
+            total = count + chunk_count
+            delta = np.where(chunk_count > 0, chunk_mean - mean, 0)
+            mean = np.where(total > 0, mean + delta * chunk_count / total, 0)
+            m2 = np.where(total > 0, m2 + np.nan_to_num(chunk_m2) + delta ** 2 * count * chunk_count / total, 0)
+        count = total
+
+        if len(X):
+            mins = np.fmin(mins, np.fmin.reduce(X, axis=0))
+            maxs = np.fmax(maxs, np.fmax.reduce(X, axis=0))
+
+        # keep the rows with the smallest random keys: a uniform sample of all rows seen
+        keys = np.concatenate([keys, rng.random(len(X))])
+        sample = np.concatenate([sample, X])
+        if len(keys) > sample_size:
+            keep = np.argpartition(keys, sample_size)[:sample_size]
+            keys, sample = keys[keep], sample[keep]
+
+    if columns is None:
+        raise ValueError('No chunk to profile')
+
+    profile = pd.DataFrame(index=columns)
+    profile['rows'] = rows
+    profile['null_count'] = nulls
+    profile['null_percent'] = nulls / max(rows, 1) * 100
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stats = {'min': mins, 'max': maxs,
+                 'mean': np.where(count > 0, mean, np.nan),
+                 'std': np.where(count > 1, np.sqrt(m2 / (count - 1)), np.nan)}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        for q, values in zip(quantiles, np.nanquantile(sample, quantiles, axis=0)):
+            stats[f'q{q * 100:g}'] = values
+
+    for name, values in stats.items():
+        profile[name] = np.nan
+        profile.loc[numerical, name] = values
+
+    return profile
+
+
+def profile_csv(csv_path, chunksize=10000, **kwargs):
+    """Profile a CSV file chunk by chunk without loading it (see `profile_chunks`)
+
+    Args:
+        csv_path (str): CSV file to profile
+        chunksize (int, optional): Number of rows per chunk. Defaults to 10000.
+        **kwargs: Passed to `profile_chunks`
+
+    Returns:
+        Pandas DataFrame: Statistics per column
+    """
+    return profile_chunks(pd.read_csv(csv_path, chunksize=chunksize), **kwargs)
+
+
+def profile_dataset(csv_path, chunksize=100000, **kwargs):
+    """Profile a dataset from its memory-mapped columnar cache (see `dataset_cache.load_dataset`)
+
+    Args:
+        csv_path (str): CSV file of the dataset
+        chunksize (int, optional): Number of rows per chunk. Defaults to 100000.
+        **kwargs: Passed to `profile_chunks`
+
+    Returns:
+        Pandas DataFrame: Statistics per column
+    """
+    data = load_dataset(csv_path)
+    chunks = (data.iloc[start:start + chunksize] for start in range(0, max(len(data), 1), chunksize))
+
+    return profile_chunks(chunks, **kwargs)
+
+
+def columns_to_drop(profile, threshold):
+    """Columns missing more than `threshold` percent of values (same rule as `drop_col_percent_na`)
+
+    Args:
+        profile (Pandas DataFrame): Output of one of the profiling functions
+        threshold (float/int): Percentage of NaN beyond which a column should be dropped (from 1 to 100)
+
+    Returns:
+        list: Names of the columns to drop
+    """
+    return profile.index[profile['null_percent'] > threshold].tolist()
+
+
+# EDA plot
+def plot_missing(profile, ax=None):
+    """Horizontal bar plot of the percentage of missing values per column
+
+    Args:
+        profile (Pandas DataFrame): Output of one of the profiling functions
+        ax (matplotlib Axes, optional): Axes to draw on. Defaults to a new figure.
+
+    Returns:
+        matplotlib Axes: The plot
+    """
+    if ax is None:
+        _, ax = plt.subplots(figsize=(10, max(4, len(profile) * 0.25)))
+
+    profile['null_percent'].sort_values().plot.barh(ax=ax, color='grey')
+    ax.set_title('Missing values per column', color='grey', size=20)
+    ax.set_xlabel('Missing values (%)')
+
+    return ax
@@ -0,0 +1,84 @@
+# Dependencies
+import time
+
+
+class ReplayScheduler:
+    """Plays back `nb_windows` predicted windows at `rate` windows per second. The position is
+    computed from the clock when it is read, so nothing sleeps or runs in the background: the
+    app reruns (e.g. with an auto-refresh) and displays the window at the current position.
+
+    Args:
+        nb_windows (int): Number of windows to replay
+        rate (float, optional): Windows per second. Defaults to 1.
+        clock (callable, optional): Returns the current time in seconds. Defaults to `time.monotonic`.
+    """
+
+    def __init__(self, nb_windows, rate=1.0, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+
+        self.nb_windows = nb_windows
+        self.rate = rate
+        self.clock = clock
+        self._offset = 0.0
+        self._started = clock()
+        self._paused = False
+
+    def _elapsed_windows(self):
+        if self._paused:
+            return 0.0
+        return (self.clock() - self._started) * self.rate
+
+    def _rebase(self):
+        # fold the windows played so far into the offset, then restart the clock
+        self._offset = min(self._offset + self._elapsed_windows(), self.nb_windows)
+        self._started = self.clock()
+
+    @property
+    def position(self):
+        """int: Number of windows played, from 0 to `nb_windows`"""
+        return int(min(self._offset + self._elapsed_windows(), self.nb_windows))
+
+    @property
+    def done(self):
+        """bool: True once every window was played"""
+        return self.position >= self.nb_windows
+
+    @property
+    def paused(self):
+        return self._paused
+
+    def pause(self):
+        self._rebase()
+        self._paused = True
+
+    def resume(self):
+        self._paused = False
+        self._started = self.clock()
+
+    def set_rate(self, rate):
+        """Change the playback rate without moving the position"""
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self._rebase()
+        self.rate = rate
+
+    def seek(self, position):
+        """Move to window `position` (clipped to the replay)"""
+        self._offset = float(min(max(position, 0), self.nb_windows))
+        self._started = self.clock()
+
+    def fast_forward(self, nb_windows=None):
+        """Skip `nb_windows` windows, or to the end when None"""
+        if nb_windows is None:
+            self.seek(self.nb_windows)
+        else:
+            self.seek(self.position + nb_windows)
+
+    def next_update_in(self):
+        """float: Seconds until the next window is played, None when paused or done"""
+        if self._paused or self.done:
+            return None
+
+        played = self._offset + self._elapsed_windows()
+        return (int(played) + 1 - played) / self.rate
@@ -0,0 +1,82 @@
+# Dependencies
+import pandas as pd
+import numpy as np
+
+from sklearn.base import clone
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from utilities import select_columns
+
+
+def iter_chunks(csv_path, columns_to_keep, chunksize=10000):
+    """Read `csv_path` chunk by chunk, keeping the columns selected by `select_columns`
+
+    Args:
+        csv_path (str): CSV file to read
+        columns_to_keep (regex expression, str): columns names to keep (see `select_columns`)
+        chunksize (int, optional): Number of rows per chunk. Defaults to 10000.
+
+    Yields:
+        Pandas DataFrame: Chunk with the selected columns
+    """
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        yield select_columns(chunk, columns_to_keep)
+
+
+# Out-of-core training
+def train_streaming(csv_path, model, columns_to_keep, threshold=50, chunksize=10000,
+                    target='target', n_epochs=5):
+    """Train `model` on a CSV larger than memory. Only one chunk is in memory at a time:
+       1. a first pass counts missing values per column and drops columns missing more than
+          `threshold` percent (same rule as `drop_col_percent_na`) and collects the classes
+       2. a second pass fits a `StandardScaler` incrementally (missing values are ignored)
+       3. `n_epochs` passes train the model with `partial_fit` on scaled, mean-imputed chunks
+
+    Args:
+        csv_path (str): CSV file to train on
+        model (sklearn estimator): Model with a `partial_fit` method, e.g. `SGDClassifier`
+        columns_to_keep (regex expression, str): columns names to keep, must include `target`
+        threshold (float/int, optional): Percentage of NaN beyond which a column is dropped. Defaults to 50.
+        chunksize (int, optional): Number of rows per chunk. Defaults to 10000.
+        target (str, optional): Target column. Defaults to 'target'.
+        n_epochs (int, optional): Number of passes of `partial_fit` over the data. Defaults to 5.
+
+    Returns:
+        Tuple(sklearn Pipeline, list): Fitted pipeline (scaler, imputer, model) and the feature columns it expects
+    """
+    if not hasattr(model, 'partial_fit'):
+        raise ValueError(f'{type(model).__name__} has no partial_fit method')
+
+    # 1. missing values and classes
+    null_counts, nb_rows, classes = None, 0, set()
+    for chunk in iter_chunks(csv_path, columns_to_keep, chunksize):
+        counts = chunk.isnull().sum()
+        null_counts = counts if null_counts is None else null_counts + counts
+        nb_rows += len(chunk)
+        classes.update(chunk[target].dropna().unique())
+
+    to_drop = (null_counts / nb_rows * 100) > threshold
+    columns = [c for c in null_counts.index[~to_drop] if c != target]
+    classes = np.array(sorted(classes))
+
+    # 2. incremental preprocessing
+    scaler = StandardScaler()
+    for chunk in iter_chunks(csv_path, columns_to_keep, chunksize):
+        scaler.partial_fit(chunk[columns].to_numpy(dtype=float))
+
+    # after scaling, the column means are 0
+    imputer = SimpleImputer(strategy='constant', fill_value=0).fit(np.zeros((1, len(columns))))
+
+    # 3. incremental model training
+    model = clone(model)
+    for _ in range(n_epochs):
+        for chunk in iter_chunks(csv_path, columns_to_keep, chunksize):
+            chunk = chunk.dropna(subset=[target])
+            X = imputer.transform(scaler.transform(chunk[columns].to_numpy(dtype=float)))
+            model.partial_fit(X, chunk[target].to_numpy(), classes=classes)
+
+    pipe = Pipeline([('scaler', scaler), ('imputer', imputer), ('model', model)])
+
+    return pipe, columns
@@ -0,0 +1,257 @@
+# Dependencies
+import argparse
+import json
+import os
+
+import pandas as pd
+import numpy as np
+from scipy.special import ndtr, ndtri
+
+from dataset_cache import DATASETS_DIR, load_dataset
+
+
+# Datasets the generator learns from by default (the other data/ files have no user column)
+DATASET_PATHS = [os.path.join('data', 'dataset_5secondWindow.csv')]
+
+LABELS = ['target', 'user']
+
+# Row numbers, regenerated as a running index
+INDEX_COLUMNS = ['Unnamed: 0', 'id']
+
+
+class TMDGenerator:
+    """Generates datasets similar to the TMD windows. For every (target, user) group it learns:
+       - the frequency of the group
+       - the patterns of missing values (which columns are NaN together) and their frequencies
+       - the distribution of every column (quantiles) and the dependence between columns
+         (correlation of the normal scores, a Gaussian copula)
+    Generated rows pick a group, a missing pattern of that group and values drawn from its copula,
+    so marginal distributions, bounds and missing sensors follow the original data.
+
+    Args:
+        n_quantiles (int, optional): Number of quantiles kept per column and group. Defaults to 100.
+        random_state (int, optional): Seed of the random generator. Defaults to 0.
+    """
+
+    def __init__(self, n_quantiles=100, random_state=0):
+        self.n_quantiles = n_quantiles
+        self.random_state = random_state
+
+    def fit(self, data):
+        """Learn the groups, missing patterns and distributions of `data`
+
+        Args:
+            data (Pandas DataFrame): Dataset with the TMD columns, including `target` and `user`
+
+        Returns:
+            TMDGenerator: self
+        """
+        absent = [label for label in LABELS if label not in data.columns]
+        if absent:
+            raise ValueError(f'data has no {absent} column(s)')
+        data = data.dropna(subset=LABELS)
+
+        self.columns_ = list(data.columns)
+        self.features_ = [c for c in data.columns if c not in LABELS + INDEX_COLUMNS]
+        self.integer_features_ = [c for c in self.features_ if pd.api.types.is_integer_dtype(data[c])]
+
+        X = data[self.features_].to_numpy(dtype=float)
+        codes, groups = pd.MultiIndex.from_frame(data[LABELS]).factorize()
+        self.groups_ = list(groups)
+        self.group_weights_ = np.bincount(codes, minlength=len(groups)) / len(codes)
+        self.categories_ = {label: sorted(data[label].dropna().unique()) for label in LABELS}
+
+        grid = np.linspace(0, 1, self.n_quantiles)
+        self.masks_, self.mask_weights_, self.quantiles_, self.factors_ = [], [], [], []
+        for group in range(len(groups)):
+            Xg = X[codes == group]
+            missing = np.isnan(Xg)
+
+            masks, counts = np.unique(missing, axis=0, return_counts=True)
+            self.masks_.append(masks)
+            self.mask_weights_.append(counts / counts.sum())
+
+            observed = (~missing).any(axis=0)
+            quantiles = np.full((self.n_quantiles, Xg.shape[1]), np.nan)
+            quantiles[:, observed] = np.nanquantile(Xg[:, observed], grid, axis=0)
+            self.quantiles_.append(quantiles)
+
+            # normal scores of the observed values (0, the mean, where missing)
+            ranks = pd.DataFrame(Xg).rank(pct=False).to_numpy()
+            nb_observed = (~missing).sum(axis=0)
+            scores = np.nan_to_num(ndtri(ranks / (nb_observed + 1)))
+
+            cov = scores.T @ scores
+            norm = np.sqrt(np.diag(cov))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                corr = np.nan_to_num(cov / np.outer(norm, norm))
+            np.fill_diagonal(corr, 1)
+
+            # closest positive definite matrix, then its square root
+            eigenvalues, eigenvectors = np.linalg.eigh(corr)
+            factor = eigenvectors * np.sqrt(np.clip(eigenvalues, 1e-6, None))
+            self.factors_.append(factor / np.sqrt((factor ** 2).sum(axis=1, keepdims=True)))
+
+        return self
+
+    def sample(self, nb_rows, rng=None, start=0):
+        """Generate `nb_rows` rows
+
+        Args:
+            nb_rows (int): Number of rows
+            rng (numpy Generator, optional): Random generator. Defaults to a new one seeded with `random_state`.
+            start (int, optional): First value of the index columns. Defaults to 0.
+
+        Returns:
+            Pandas DataFrame: Rows with the columns of the fitted data
+        """
+        rng = np.random.default_rng(self.random_state) if rng is None else rng
+        counts = rng.multinomial(nb_rows, self.group_weights_)
+        columns = np.arange(len(self.features_))
+
+        X = np.empty((nb_rows, len(self.features_)))
+        group_of_row = np.repeat(np.arange(len(self.groups_)), counts)
+        offset = 0
+        for group, count in enumerate(counts):
+            if count == 0:
+                continue
+
+            # copula draw, then quantile function of every column (linear interpolation)
+            u = ndtr(rng.standard_normal((count, len(self.features_))) @ self.factors_[group].T)
+            position = u * (self.n_quantiles - 1)
+            low = np.minimum(position.astype(np.intp), self.n_quantiles - 2)
+            quantiles = self.quantiles_[group]
+            values = quantiles[low, columns] + (position - low) * (quantiles[low + 1, columns] - quantiles[low, columns])
+
+            masks = self.masks_[group][rng.choice(len(self.mask_weights_[group]), count, p=self.mask_weights_[group])]
+            values[masks] = np.nan
+            X[offset:offset + count] = values
+            offset += count
+
+        # interleave the groups
+        order = rng.permutation(nb_rows)
+        X, group_of_row = X[order], group_of_row[order]
+
+        data = {}
+        features = dict(zip(self.features_, X.T))
+        for column in self.columns_:
+            if column in INDEX_COLUMNS:
+                data[column] = np.arange(start, start + nb_rows)
+            elif column in LABELS:
+                level = LABELS.index(column)
+                data[column] = np.array([group[level] for group in self.groups_], dtype=object)[group_of_row]
+            elif column in self.integer_features_:
+                data[column] = np.round(features[column]).astype(np.int64)
+            else:
+                data[column] = features[column]
+
+        return pd.DataFrame(data)
+
+    def iter_chunks(self, nb_rows, chunksize=100000):
+        """Generate `nb_rows` rows, `chunksize` at a time
+
+        Yields:
+            Pandas DataFrame: Chunk of generated rows
+        """
+        rng = np.random.default_rng(self.random_state)
+        for start in range(0, nb_rows, chunksize):
+            yield self.sample(min(chunksize, nb_rows - start), rng, start)
+
+    def to_csv(self, path, nb_rows, chunksize=100000):
+        """Write `nb_rows` generated rows to the CSV file `path`, one chunk in memory at a time
+
+        Returns:
+            str: `path`
+        """
+        with open(path, 'w', newline='') as f:
+            for i, chunk in enumerate(self.iter_chunks(nb_rows, chunksize)):
+                chunk.to_csv(f, header=i == 0, index=False)
+
+        return path
+
+    def to_cache(self, nb_rows, folder=None, chunksize=100000):
+        """Write `nb_rows` generated rows in the columnar cache format (see `dataset_cache`), one
+        chunk in memory at a time. The result is loaded with `dataset_cache.load_cache(folder)`.
+
+        Args:
+            nb_rows (int): Number of rows
+            folder (str, optional): Output folder. Defaults to a folder of `DATASETS_DIR` named after the size and seed.
+            chunksize (int, optional): Number of rows generated at a time. Defaults to 100000.
+
+        Returns:
+            str: Folder of the cached columns
+        """
+        if folder is None:
+            folder = os.path.join(DATASETS_DIR, f'synthetic-{nb_rows}-{self.random_state}')
+        os.makedirs(folder, exist_ok=True)
+
+        columns, arrays = [], {}
+        for i, name in enumerate(self.columns_):
+            column = {'name': name, 'file': f'{i}.npy'}
+            if name in LABELS:
+                dtype = np.int32
+                column['categories'] = [str(c) for c in self.categories_[name]]
+            elif name in INDEX_COLUMNS or name in self.integer_features_:
+                dtype = np.int64
+            else:
+                dtype = np.float64
+            arrays[name] = np.lib.format.open_memmap(os.path.join(folder, column['file']), mode='w+',
+                                                     dtype=dtype, shape=(nb_rows,))
+            columns.append(column)
+
+        start = 0
+        for chunk in self.iter_chunks(nb_rows, chunksize):
+            for name, array in arrays.items():
+                values = chunk[name]
+                if name in LABELS:
+                    values = pd.Categorical(values, categories=self.categories_[name]).codes
+                array[start:start + len(chunk)] = values
+            start += len(chunk)
+
+        for array in arrays.values():
+            array.flush()
+        del arrays
+
+        # meta.json is written last, its presence marks a complete cache
+        meta_path = os.path.join(folder, 'meta.json')
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump({'source': 'synthetic', 'columns': columns}, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+        return folder
+
+
+def fit_generator(csv_paths=DATASET_PATHS, **kwargs):
+    """Fit a `TMDGenerator` on the rows of `csv_paths` (read from their columnar caches), which
+    must share the same columns
+
+    Args:
+        csv_paths (list of str, optional): Datasets to learn from. Defaults to `DATASET_PATHS`.
+        **kwargs: Passed to `TMDGenerator`
+
+    Returns:
+        TMDGenerator: Fitted generator
+    """
+    datasets = [load_dataset(path, mmap=False) for path in csv_paths]
+    for path, dataset in zip(csv_paths, datasets):
+        if list(dataset.columns) != list(datasets[0].columns):
+            raise ValueError(f'{path} does not have the columns of {csv_paths[0]}')
+    data = pd.concat(datasets, ignore_index=True)
+
+    return TMDGenerator(**kwargs).fit(data)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic TMD dataset')
+    parser.add_argument('rows', type=int)
+    parser.add_argument('--format', choices=['csv', 'cache'], default='csv')
+    parser.add_argument('--output', default=None, help='CSV file or cache folder')
+    parser.add_argument('--chunksize', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    generator = fit_generator(random_state=args.seed)
+    if args.format == 'csv':
+        print(generator.to_csv(args.output or f'synthetic_{args.rows}.csv', args.rows, args.chunksize))
+    else:
+        print(generator.to_cache(args.rows, args.output, args.chunksize))
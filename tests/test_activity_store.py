@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from activity_store import activity_totals, daily_activity, record_windows
+from calories import window_calories
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'activity.db')
+
+
+def test_calories_use_the_weight_when_reading(db_path):
+    activities = np.array(['walking', 'still', 'walking', 'car'])
+    record_windows('ana', activities, days='2026-10-17', source='example.csv', db_path=db_path)
+
+    # replaying the source adds nothing
+    assert record_windows('ana', activities, days='2026-10-17', source='example.csv', db_path=db_path) == 0
+
+    # windows recorded before a weight is known still get calories
+    for weight in (60, 80):
+        totals = activity_totals('ana', weight, db_path=db_path)
+        assert totals['windows'].to_dict() == {'car': 1, 'still': 1, 'walking': 2}
+        assert totals['kcal'].sum() == pytest.approx(window_calories(activities, weight).sum())
+
+
+def test_without_weight(db_path):
+    record_windows('ana', ['walking', 'walking'], days=['2026-10-16', '2026-10-17'], db_path=db_path)
+
+    history = daily_activity('ana', start='2026-10-17', db_path=db_path)
+    assert list(history.columns) == ['day', 'activity', 'windows', 'seconds']
+    assert history[['day', 'windows', 'seconds']].values.tolist() == [['2026-10-17', 1, 5.0]]
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from sklearn.impute import KNNImputer
+
+from imputers import MAX_CACHED_TREES, TreeKNNImputer
+
+
+@pytest.mark.parametrize('algorithm', ['kd_tree', 'ball_tree'])
+def test_matches_knn_imputer(algorithm):
+    # one column missing in a third of the rows: the donors are the rows where it is observed
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((60, 4))
+    X[rng.choice(60, 20, replace=False), 3] = np.nan
+
+    expected = KNNImputer(n_neighbors=5).fit_transform(X)
+    imputed = TreeKNNImputer(n_neighbors=5, algorithm=algorithm).fit_transform(X)
+
+    np.testing.assert_allclose(imputed, expected)
+
+
+def test_no_self_donor():
+    # the row to impute is its own nearest row, the others are far: it must get their mean
+    X = np.array([[0.0, np.nan], [0.0, 1.0], [10.0, 2.0], [20.0, 3.0]])
+
+    imputed = TreeKNNImputer(n_neighbors=2).fit_transform(X)
+
+    assert imputed[0, 1] == 1.5
+
+
+@pytest.mark.parametrize('chunk_size', [10000, 1])
+def test_few_donors_among_nearest(chunk_size):
+    # the nearest rows miss column 1 too, the donors are found with wider queries (on one row
+    # at a time when the chunks are small)
+    X = np.column_stack([np.arange(30.0), np.r_[np.full(25, np.nan), np.arange(5.0)]])
+
+    imputed = TreeKNNImputer(n_neighbors=2, chunk_size=chunk_size).fit_transform(X)
+
+    np.testing.assert_allclose(imputed[:25, 1], 0.5)
+    np.testing.assert_allclose(imputed, KNNImputer(n_neighbors=2).fit_transform(X))
+
+
+def test_tree_cache_is_bounded():
+    # one missing pattern per row
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((200, 12))
+    X[rng.random(X.shape) < 0.3] = np.nan
+
+    imputer = TreeKNNImputer().fit(X)
+    imputed = imputer.transform(X)
+
+    assert len(np.unique(np.isnan(X), axis=0)) > MAX_CACHED_TREES
+    assert len(imputer._trees) == MAX_CACHED_TREES
+    assert not np.isnan(imputed).any()
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import re
+
+import joblib
+import numpy as np
+import pytest
+
+from sklearn.dummy import DummyClassifier
+
+from inference_server import InferenceServer
+
+
+COLUMNS = ['a', 'b']
+
+
+class FailingModel(DummyClassifier):
+    def predict(self, X):
+        raise RuntimeError('model is broken')
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / 'model.joblib'
+    joblib.dump(DummyClassifier(strategy='constant', constant='walking').fit(np.zeros((2, 2)), ['walking', 'still']), path)
+    return str(path)
+
+
+def exchange(server, raw):
+    # send `raw` on a new connection, return the status of every response until the server closes it
+    async def run():
+        server.batcher.start()
+        listener = await asyncio.start_server(server._handle, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(raw)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        listener.close()
+        return [int(status) for status in re.findall(rb'HTTP/1\.1 (\d{3})', response)]
+
+    return asyncio.run(run())
+
+
+def post(rows):
+    body = json.dumps({'rows': rows}).encode('utf-8')
+    return (f'POST /predict HTTP/1.1\r\nContent-Length: {len(body)}\r\n'
+            f'Connection: close\r\n\r\n').encode('latin-1') + body
+
+
+def test_predict(model_path):
+    assert exchange(InferenceServer(model_path, COLUMNS), post([[1, 2], {'a': 1}])) == [400]
+    assert exchange(InferenceServer(model_path, COLUMNS), post([[1, 2], [3, None]])) == [200]
+
+
+@pytest.mark.parametrize('raw', [b'GARBAGE\r\n\r\n',
+                                 b'POST /predict HTTP/1.1\r\nContent-Length: abc\r\n\r\n',
+                                 b'POST /predict HTTP/1.1\r\nContent-Length: -1\r\n\r\n'])
+def test_malformed_request(model_path, raw):
+    assert exchange(InferenceServer(model_path, COLUMNS), raw) == [400]
+
+
+def test_predict_failure(model_path, tmp_path):
+    path = tmp_path / 'failing.joblib'
+    joblib.dump(FailingModel().fit(np.zeros((2, 2)), ['walking', 'still']), path)
+    server = InferenceServer(str(path), COLUMNS)
+
+    # the connection stays usable after the error
+    assert exchange(server, post([[1, 2]]).replace(b'Connection: close\r\n', b'') + b'GET /health HTTP/1.1\r\nConnection: close\r\n\r\n') == [500, 200]
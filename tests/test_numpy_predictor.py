@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from sklearn.ensemble import ExtraTreesClassifier, GradientBoostingClassifier, RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from numpy_predictor import NumpyPredictor, check_parity, export_pipeline
+from utilities import pipelines
+
+
+MODELS = {'decision_tree': DecisionTreeClassifier(random_state=0),
+          'random_forest': RandomForestClassifier(n_estimators=20, random_state=0),
+          'extra_trees': ExtraTreesClassifier(n_estimators=20, random_state=0),
+          'gradient_boosting': GradientBoostingClassifier(n_estimators=20, random_state=0)}
+
+
+def make_data(nb_rows, nb_classes, rng):
+    # windows of 3 sensors with 4 statistics, sensors missing together in some rows
+    y = rng.integers(nb_classes, size=nb_rows)
+    X = rng.standard_normal((nb_rows, 12)) + y[:, None]
+    for sensor in range(3):
+        X[rng.random(nb_rows) < 0.2, sensor * 4:sensor * 4 + 4] = np.nan
+    X[rng.random(X.shape) < 0.05] = np.nan
+
+    return X, np.array(['still', 'walking', 'car'])[y]
+
+
+@pytest.fixture(scope='module')
+def fitted():
+    # one fit per (model, number of classes): binary and multi-class gradient boosting differ
+    rng = np.random.default_rng(0)
+    datasets = {nb_classes: (make_data(400, nb_classes, rng), make_data(200, nb_classes, rng)[0])
+                for nb_classes in (2, 3)}
+
+    pipes = {}
+    for nb_classes, ((X_train, y_train), X_test) in datasets.items():
+        for name, pipe in pipelines(MODELS, memory=None).items():
+            pipes[name, nb_classes] = pipe.fit(X_train, y_train), X_train, X_test
+
+    return pipes
+
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+@pytest.mark.parametrize('nb_classes', [2, 3])
+@pytest.mark.parametrize('name', list(MODELS))
+def test_parity(fitted, name, nb_classes):
+    pipe, X_train, X_test = fitted[name, nb_classes]
+    predictor = export_pipeline(pipe, X_train[:1])
+
+    # a row without any value is imputed with the training means
+    X_test = np.vstack([X_test, np.full(X_test.shape[1], np.nan)])
+    assert check_parity(pipe, predictor, X_test) == 1.0
+
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+@pytest.mark.parametrize('name', ['random_forest', 'gradient_boosting'])
+def test_save_load(fitted, tmp_path, name):
+    pipe, X_train, X_test = fitted[name, 3]
+    predictor = export_pipeline(pipe, X_train[:1])
+
+    path = tmp_path / 'predictor.npz'
+    predictor.save(path)
+    loaded = NumpyPredictor.load(path)
+
+    np.testing.assert_array_equal(loaded.predict(X_test), predictor.predict(X_test))
+    assert check_parity(pipe, loaded, X_test) == 1.0
@@ -0,0 +1,34 @@
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sklearn.dummy import DummyClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+from utilities import pipelines, perfomance
+
+
+@pytest.mark.filterwarnings('ignore::UserWarning')
+@pytest.mark.parametrize('nb_rows', [300, 5000])  # 5000 rows: the training set is memory-mapped in the workers
+def test_perfomance_fits_imputer_once(tmp_path, nb_rows):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.random((nb_rows, 40)))
+    X.iloc[::7, 2] = np.nan
+    y = pd.Series(np.where(np.arange(nb_rows) % 2, 'walking', 'still'))
+    train = nb_rows * 2 // 3
+
+    pipes = pipelines({'logistic': LogisticRegression(), 'tree': DecisionTreeClassifier(),
+                       'dummy': DummyClassifier()}, memory=str(tmp_path))
+    results = perfomance(pipes, X[:train], y[:train], X[train:], y[train:], n_jobs=2)
+
+    assert sorted(results['name']) == ['dummy', 'logistic', 'tree']
+    transformers = []
+    for path in glob.glob(os.path.join(tmp_path, '**', 'metadata.json'), recursive=True):
+        with open(path) as f:
+            transformers.append(json.load(f)['input_args'].get('transformer'))
+    assert transformers.count('KNNImputer()') == 1
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from windowing import window_features
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def reference(events, window, step):
+    # brute force: windows start every `step` and must fit in the covered sub-windows
+    start = events['time'].min()
+    nb_sub = int(np.floor((events['time'].max() - start) / step)) + 1
+    rows = []
+    for s in start + np.arange(nb_sub - int(round(window / step)) + 1) * step:
+        in_window = events[(events['time'] >= s) & (events['time'] < s + window)]
+        row = {'time': s}
+        for sensor, values in in_window.groupby('sensor')['x']:
+            prefix = f'android.sensor.{sensor}' if sensor != 'sound' else 'sound'
+            row.update({f'{prefix}#mean': values.mean(), f'{prefix}#min': values.min(),
+                        f'{prefix}#max': values.max(), f'{prefix}#std': values.std()})
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+def check(events, window=5.0, overlap=0.0):
+    features = window_features(events, window=window, overlap=overlap, values='x')
+    expected = reference(events, window, window * (1 - overlap))
+    expected = expected[expected.columns.intersection(features.columns)]
+    expected = expected.dropna(how='all', subset=expected.columns.drop('time')).reset_index(drop=True)
+
+    assert len(features) == len(expected)
+    for column in expected.columns:
+        np.testing.assert_allclose(features[column].to_numpy(dtype=float),
+                                   expected[column].to_numpy(dtype=float), rtol=1e-9, atol=1e-9)
+
+
+def test_sensor_ending_early():
+    # the last sensor in sorted order stops reporting before the last window
+    events = pd.DataFrame({'time': [0, 1, 6, 11, 16, 0, 6, 7],
+                           'sensor': ['a'] * 5 + ['b'] * 3,
+                           'x': [1., 2., 3., 4., 5., 10., 20., 100.]})
+    features = window_features(events, values='x')
+
+    assert features.loc[1, 'android.sensor.b#mean'] == pytest.approx(60)
+    assert features.loc[1, 'android.sensor.b#max'] == 100
+    assert features.loc[1, 'android.sensor.b#std'] == pytest.approx(np.std([20, 100], ddof=1))
+    assert np.isnan(features.loc[2, 'android.sensor.b#mean'])
+    check(events)
+
+
+@pytest.mark.parametrize('overlap', [0.0, 0.5, 0.75])
+def test_matches_pandas(overlap):
+    rng = np.random.default_rng(0)
+    parts = []
+    # sensors starting and ending at different times, with gaps
+    for sensor, (begin, end) in {'accelerometer': (0, 60), 'gyroscope': (3, 41), 'sound': (12, 55)}.items():
+        t = np.sort(rng.uniform(begin, end, 400))
+        t = t[(t < 20) | (t > 27)]
+        parts.append(pd.DataFrame({'time': t, 'sensor': sensor, 'x': rng.normal(10, 2, len(t))}))
+    events = pd.concat(parts, ignore_index=True).sample(frac=1, random_state=0)
+
+    check(events, overlap=overlap)
+
+
+def test_magnitude():
+    events = pd.DataFrame({'time': [0., 1.], 'sensor': 'accelerometer',
+                           'x': [3., 0.], 'y': [4., 0.], 'z': [0., 2.]})
+    features = window_features(events)
+
+    assert features.loc[0, 'android.sensor.accelerometer#max'] == pytest.approx(5)
+    assert features.loc[0, 'android.sensor.accelerometer#min'] == pytest.approx(2)
+
+
+def test_dataset_column_order():
+    # models get the features by position: the sensor blocks must come in the dataset order
+    dataset = pd.read_csv(os.path.join(DATA_DIR, 'dataset_5secondWindow.csv'), nrows=0)
+    columns = [c for c in dataset.columns if '#' in c and not c.startswith('activityrecognition')]
+    sensors = list(dict.fromkeys(c.split('#')[0].replace('android.sensor.', '') for c in columns))
+
+    rng = np.random.default_rng(0)
+    events = pd.DataFrame({'time': np.tile([0., 1.], len(sensors)),
+                           'sensor': np.repeat(rng.permutation(sensors), 2), 'x': 1.0})
+    features = window_features(events, values='x')
+
+    assert list(features.columns) == ['time'] + columns
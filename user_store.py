@@ -0,0 +1,139 @@
+# Dependencies
+import os
+import sqlite3
+import threading
+
+
+# SQLite file shared by the apps
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data.db')
+
+_local = threading.local()
+_initialized = set()
+# databases whose username index could not be made unique (legacy duplicates)
+_non_unique = set()
+_init_lock = threading.Lock()
+
+
+# One connection per thread and database
+def get_connection(db_path=DB_PATH):
+    """Return the connection of the current thread to `db_path`, opening it on first use.
+    Connections use WAL mode so logins (reads) don't wait for account creations (writes).
+
+    Args:
+        db_path (str, optional): SQLite file. Defaults to `DB_PATH`.
+
+    Returns:
+        sqlite3.Connection: Connection owned by the calling thread
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        connections[db_path] = conn
+
+    return conn
+
+
+def create_usertable(db_path=DB_PATH):
+    """Create the users table and its username index. Runs once per process and database,
+    later calls return immediately.
+
+    Args:
+        db_path (str, optional): SQLite file. Defaults to `DB_PATH`.
+    """
+    if db_path in _initialized:
+        return
+
+    with _init_lock:
+        if db_path in _initialized:
+            return
+
+        conn = get_connection(db_path)
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS userstable(username TEXT, password TEXT)')
+            try:
+                conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_userstable_username ON userstable(username)')
+            except sqlite3.IntegrityError:
+                # databases created before the index may hold duplicated usernames, new ones
+                # are then checked against the table on insert (see `add_users`)
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_userstable_username_dup ON userstable(username)')
+                _non_unique.add(db_path)
+
+        _initialized.add(db_path)
+
+
+def add_userdata(username, password, db_path=DB_PATH):
+    """Register a new user
+
+    Args:
+        username (str): Name of the user
+        password (str): Password of the user
+        db_path (str, optional): SQLite file. Defaults to `DB_PATH`.
+
+    Returns:
+        bool: True if the user was added, False if the username is already taken
+    """
+    return add_users([(username, password)], db_path) == 1
+
+
+def add_users(users, db_path=DB_PATH):
+    """Register several users in a single transaction, skipping usernames already taken
+
+    Args:
+        users (iterable of tuple): (username, password) pairs
+        db_path (str, optional): SQLite file. Defaults to `DB_PATH`.
+
+    Returns:
+        int: Number of users added
+    """
+    create_usertable(db_path)
+    conn = get_connection(db_path)
+    with conn:
+        before = conn.total_changes
+        if db_path in _non_unique:
+            # no unique index to ignore taken usernames: take the write lock, then insert only
+            # the names not in the table (earlier rows of `users` included)
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany('INSERT INTO userstable(username, password) SELECT ?1, ?2 '
+                             'WHERE NOT EXISTS (SELECT 1 FROM userstable WHERE username = ?1)', users)
+        else:
+            conn.executemany('INSERT OR IGNORE INTO userstable(username, password) VALUES(?,?)', users)
+
+        return conn.total_changes - before
+
+
+def login_user(username, password, db_path=DB_PATH):
+    """Find the user matching `username` and `password` (uses the username index)
+
+    Args:
+        username (str): Name of the user
+        password (str): Password of the user
+        db_path (str, optional): SQLite file. Defaults to `DB_PATH`.
+
+    Returns:
+        list: Matching (username, password) rows, empty if the login failed
+    """
+    create_usertable(db_path)
+    cursor = get_connection(db_path).execute(
+        'SELECT * FROM userstable WHERE username = ? AND password = ?', (username, password))
+
+    return cursor.fetchall()
+
+
+def view_all_users(db_path=DB_PATH):
+    """Return all registered users
+
+    Args:
+        db_path (str, optional): SQLite file. Defaults to `DB_PATH`.
+
+    Returns:
+        list: (username, password) rows
+    """
+    create_usertable(db_path)
+
+    return get_connection(db_path).execute('SELECT * FROM userstable').fetchall()
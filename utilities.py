@@ -1,18 +1,110 @@
 # Dependencies
-from tqdm import tqdm
-
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 import time
+import re
+import os
+from functools import lru_cache
+from joblib import Parallel, delayed, hash as joblib_hash
 
+from sklearn.base import clone
 from sklearn.pipeline import Pipeline
 from sklearn.impute import KNNImputer
 from sklearn.preprocessing import StandardScaler, QuantileTransformer
 
+from imputers import TreeKNNImputer
+
 
 from sklearn.metrics import accuracy_score, ConfusionMatrixDisplay, balanced_accuracy_score, f1_score, recall_score, precision_score
-from sklearn.model_selection import cross_val_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.utils.validation import check_memory
+
+
+# Directory where fitted preprocessors and other intermediate results are cached
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+
+# Columns naming: android.sensor.<sensor>#<statistic>
+class ColumnSchema:
+    """Parses column names once into (sensor, statistic) pairs and memoizes selections.
+
+    Args:
+        columns (list of str): Column names of the dataset
+    """
+    _STRIP = re.compile('android.sensor.|mean|std|min|max|#')
+
+    def __init__(self, columns):
+        self.columns = pd.Index(columns)
+
+        pairs = []
+        for column in self.columns:
+            sensor, _, stat = str(column).partition('#')
+            pairs.append((sensor.replace('android.sensor.', '', 1), stat))
+        self.index = pd.MultiIndex.from_tuples(pairs, names=['sensor', 'statistic'])
+
+        # lookup tables from sensor and (sensor, statistic) to column positions
+        self._by_sensor = {}
+        self._by_pair = {}
+        for position, (sensor, stat) in enumerate(pairs):
+            self._by_sensor.setdefault(sensor, []).append(position)
+            self._by_pair[(sensor, stat)] = position
+
+        # names as seen by the `select_columns` regex
+        self._stripped = [self._STRIP.sub('', str(column)) for column in self.columns]
+        self._patterns = {}
+
+    def positions(self, sensors, stats=None):
+        """Integer positions of the columns of `sensors`, optionally restricted to `stats`
+
+        Args:
+            sensors (iterable of str): Sensor names, e.g. ['accelerometer', 'sound']
+            stats (iterable of str, optional): Statistics to keep, e.g. ['mean', 'std']. Defaults to all.
+
+        Returns:
+            list: Sorted column positions
+        """
+        if stats is None:
+            found = [p for sensor in sensors for p in self._by_sensor.get(sensor, [])]
+        else:
+            found = [self._by_pair[(sensor, stat)] for sensor in sensors for stat in stats
+                     if (sensor, stat) in self._by_pair]
+
+        return sorted(found)
+
+    def match(self, columns_to_keep):
+        """Integer positions of the columns whose stripped name fully matches `columns_to_keep`
+        (same rule as `select_columns`). Results are memoized per pattern.
+
+        Args:
+            columns_to_keep (regex expression, str): columns names to keep
+
+        Returns:
+            numpy array: Sorted column positions
+        """
+        if columns_to_keep not in self._patterns:
+            pattern = re.compile(columns_to_keep)
+            self._patterns[columns_to_keep] = np.array(
+                [i for i, name in enumerate(self._stripped) if pattern.fullmatch(name)], dtype=np.intp)
+
+        return self._patterns[columns_to_keep]
+
+
+@lru_cache(maxsize=32)
+def _schema_for(columns):
+    return ColumnSchema(columns)
+
+
+def get_schema(dataset):
+    """Return the (cached) `ColumnSchema` of `dataset` columns
+
+    Args:
+        dataset (Pandas DataFrame): Dataset whose columns to parse
+
+    Returns:
+        ColumnSchema: Schema shared by every dataset with the same columns
+    """
+    return _schema_for(tuple(dataset.columns))
 
 
 # Select columns
@@ -26,26 +118,31 @@ def select_columns(dataset, columns_to_keep):
     Returns:
         Pandas Dataframe: Dataset with selected column(s)
     """
-    column_filter = dataset.columns.str.replace(
-        'android.sensor.|mean|std|min|max|#', '', regex=True).str.fullmatch(columns_to_keep)
-
-    return dataset.loc[:, column_filter]
+    return dataset.iloc[:, get_schema(dataset).match(columns_to_keep)]
 
 
 # drop column(s) based on missing value percentage
-def drop_col_percent_na(dataset, threshold):
+def drop_col_percent_na(dataset, threshold, profile=None):
     """Drop columns missing value greater than `threshold`
 
     Args:
         dataset (Pandas Dataframe): Dataframe from which to drop columns
         threshold (float/int): Percentage of NaN beyong which a column should be dropped (from 1 to 100)
+        profile (Pandas Dataframe, optional): Precomputed statistics (see `profiling`) with a `null_percent` column, e.g. of the whole dataset when `dataset` is a chunk. Defaults to None.
 
     Returns:
         Pandas Dataframe: Dataset with dropped column(s)
     """
-    to_drop = (dataset.isnull().sum()/dataset.shape[0]*100) > threshold
+    if profile is None:
+        # counted column by column, no boolean copy of the whole frame
+        null_percent = pd.Series([column.isna().sum() for _, column in dataset.items()],
+                                 index=dataset.columns) / dataset.shape[0] * 100
+    else:
+        null_percent = profile['null_percent'].reindex(dataset.columns)
 
-    return dataset.loc[:, ~to_drop]
+    to_drop = null_percent > threshold
+
+    return dataset.loc[:, ~to_drop.to_numpy()]
 
 
 # Split train test sets
@@ -74,104 +171,314 @@ def split_train_test(data, upper_boundary=1, lower_boundary=3, nb_users_test=3):
     # users in test set
     test_users = np.random.choice(to_choose_from, nb_users_test, replace=False)
 
-    # splitting into train and test sets
-    train = pd.DataFrame()
-    test = pd.DataFrame()
-    for _, row in data.iterrows():
-        if row["user"] in test_users:
-            test = pd.concat([test, row], axis=1)
+    return split_train_test2(data, test_users)
 
-        else:
-            train = pd.concat([train, row], axis=1)
 
-    return train.T, test.T
+def split_train_test2(df, test_users):
+    """Split `df` into train and test sets given the users going into the test set.
+    Rows are selected with a boolean mask so the original column dtypes are kept.
 
+    Args:
+        df (Pandas DataFrame): Dataset to split, must have a `user` column
+        test_users (array-like): Users to put in the test set
 
-def split_train_test2(df, test_users):
-    train = pd.DataFrame()
-    test = pd.DataFrame()
-    for _, row in df.iterrows():
-        if row["user"] in test_users:
-            test = pd.concat([test, row], axis=1)
+    Returns:
+        Tuple(Pandas DataFrame, Pandas DataFrame): Both train and test sets
+    """
+    is_test = df['user'].isin(test_users).to_numpy()
 
-        else:
-            train = pd.concat([train, row], axis=1)
+    return df.loc[~is_test], df.loc[is_test]
 
-    return train.T, test.T
 
+# Cross validation folds based on users
+def user_kfold(data, n_splits=5, groups='user'):
+    """Generate train/test row positions where each user lands in exactly one test fold,
+    like sklearn `GroupKFold`. Users are assigned greedily (largest first) to the fold with
+    the fewest records so folds stay balanced. Can be passed as `cv` to sklearn functions.
 
-# Preprocessing + model pipeline
-def pipelines(models):
-    """Create pipelines made up preprocessors(Imputer, StandardScaler) and models
+    Args:
+        data (Pandas DataFrame): Dataset to split
+        n_splits (int, optional): Number of folds. Defaults to 5.
+        groups (str, optional): Column holding the user ids. Defaults to 'user'.
+
+    Yields:
+        Tuple(numpy array, numpy array): Positions of train and test rows
+    """
+    codes, users = pd.factorize(data[groups])
+    if n_splits > len(users):
+        raise ValueError(
+            f'Cannot have n_splits={n_splits} greater than the number of users ({len(users)})')
+
+    # assign users to folds, biggest users first
+    sizes = np.bincount(codes, minlength=len(users))
+    user_fold = np.empty(len(users), dtype=np.intp)
+    fold_sizes = np.zeros(n_splits, dtype=np.int64)
+    for user in np.argsort(sizes, kind='stable')[::-1]:
+        fold = np.argmin(fold_sizes)
+        user_fold[user] = fold
+        fold_sizes[fold] += sizes[user]
+
+    row_fold = user_fold[codes]
+    for fold in range(n_splits):
+        is_test = row_fold == fold
+        yield np.flatnonzero(~is_test), np.flatnonzero(is_test)
+
+
+# Preprocessing
+def make_preprocessor(imputation='knn'):
+    """Create the preprocessing steps shared by every model (imputer, StandardScaler, QuantileTransformer)
 
     Args:
-        models (dict): A dictionary of model's name as key and sklearn corresponding algorithm as value
+        imputation (str, optional): 'knn' for exact `KNNImputer`, 'tree' for the faster approximate `TreeKNNImputer`. Defaults to 'knn'.
 
     Returns:
-        dict: A dictionary of model's name as key and pipeline (preprocessing + model) as value
+        sklearn Pipeline: Unfitted preprocessing pipeline
     """
 
     # Preprocessors
     # imputer = IterativeImputer(random_state=0, max_iter=30)
-    imputer = KNNImputer()
+    if imputation == 'knn':
+        imputer = KNNImputer()
+    elif imputation == 'tree':
+        imputer = TreeKNNImputer()
+    else:
+        raise ValueError(f"imputation should be 'knn' or 'tree', got {imputation!r}")
     # imputer = SimpleImputer(strategy='median')
     scaler = StandardScaler()
     qtransf = QuantileTransformer(output_distribution='normal')
 
-    # Pipelines of preprocessor(s) and models
-    pipes = {name: Pipeline([
+    return Pipeline([
         ('imputer', imputer),
         ('scaler', scaler),
-        ('qtransf', qtransf),
-        ('model', model)
-    ]) for name, model in models.items()}
+        ('qtransf', qtransf)
+    ])
+
+
+# Preprocessing + model pipeline
+def pipelines(models, memory=CACHE_DIR, imputation='knn'):
+    """Create pipelines made up preprocessors(Imputer, StandardScaler) and models.
+    Every pipeline gets its own copy of the preprocessors. Fitted preprocessors are cached in
+    `memory` keyed on their parameters and the training data, so the preprocessing is fitted
+    once per dataset and reused by every model.
+
+    Args:
+        models (dict): A dictionary of model's name as key and sklearn corresponding algorithm as value
+        memory (str or joblib.Memory, optional): Cache directory for fitted preprocessors, None to disable caching. Defaults to `CACHE_DIR`.
+        imputation (str, optional): 'knn' for exact `KNNImputer`, 'tree' for the faster approximate `TreeKNNImputer`. Defaults to 'knn'.
+
+    Returns:
+        dict: A dictionary of model's name as key and pipeline (preprocessing + model) as value
+    """
+
+    preprocessor = make_preprocessor(imputation)
+
+    # Pipelines of preprocessor(s) and models
+    pipes = {name: Pipeline(clone(preprocessor).steps + [('model', model)], memory=memory)
+             for name, model in models.items()}
 
     return pipes
 
 
+# Batched prediction
+def predict_batches(model, data, batch_size=None):
+    """Predict all rows of `data` with a single vectorized `predict` call, or one call per
+    `batch_size` rows to bound memory on long recordings
+
+    Args:
+        model (sklearn estimator): Fitted model or pipeline
+        data (Pandas DataFrame or numpy array): Rows to predict
+        batch_size (int, optional): Number of rows per call, None to predict everything at once. Defaults to None.
+
+    Returns:
+        numpy array: One prediction per row of `data`
+    """
+    values = np.asarray(data)
+    if batch_size is None or len(values) <= batch_size:
+        return model.predict(values)
+
+    return np.concatenate([model.predict(values[start:start + batch_size])
+                           for start in range(0, len(values), batch_size)])
+
+
+# Test set metrics of the performance tables
+def _scores(y_true, preds):
+    # f1, precision and recall are averaged over classes unless the target is a 0/1 or -1/1 label
+    binary = set(np.unique(y_true)) <= {0, 1} or set(np.unique(y_true)) <= {-1, 1}
+    average = 'binary' if binary else 'macro'
+
+    return {'balanced_accuracy': balanced_accuracy_score(y_true, preds),
+            'f1_score': f1_score(y_true, preds, average=average, zero_division=0),
+            'precision': precision_score(y_true, preds, average=average, zero_division=0),
+            'recall': recall_score(y_true, preds, average=average, zero_division=0)}
+
+
+# Cross validation folds
+def make_folds(y, cv=5, groups=None, random_state=0):
+    """Compute cross validation folds once so they can be reused by every model
+
+    Args:
+        y (array-like): Target, folds are stratified on it when `groups` is None
+        cv (int, optional): Number of folds. Defaults to 5.
+        groups (array-like, optional): User of every row, each user lands in exactly one test fold (see `user_kfold`). Defaults to None.
+        random_state (int, optional): Seed of the stratified shuffling. Defaults to 0.
+
+    Returns:
+        list: (train positions, test positions) per fold
+    """
+    if groups is not None:
+        return list(user_kfold(pd.DataFrame({'user': np.asarray(groups)}), n_splits=cv))
+
+    skf = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+
+    return list(skf.split(np.zeros(len(y)), y))
+
+
+def _preprocess_fold(preprocessor, X, y, train, test):
+    preprocessor = clone(preprocessor).fit(X[train], y[train])
+
+    return preprocessor.transform(X[train]), y[train], preprocessor.transform(X[test]), y[test]
+
+
+def preprocess_folds(X, y, folds, imputation='knn', memory=CACHE_DIR, n_jobs=-1, preprocessor=None):
+    """Fit the preprocessing (see `make_preprocessor`) on the training part of every fold and
+    transform both parts, once for all the models evaluated on these folds. Folds run in
+    parallel and their matrices are cached in `memory` keyed on the data and the folds.
+
+    Args:
+        X (Pandas DataFrame or numpy array): Features
+        y (Pandas Series or numpy array): Target
+        folds (list): (train positions, test positions) per fold, see `make_folds`
+        imputation (str, optional): See `make_preprocessor`. Defaults to 'knn'.
+        memory (str or joblib.Memory, optional): Cache directory, None to disable caching. Defaults to `CACHE_DIR`.
+        n_jobs (int, optional): Number of worker processes, -1 for all cores. Defaults to -1.
+        preprocessor (sklearn estimator, optional): Preprocessing to fit instead of `make_preprocessor(imputation)`. Defaults to None.
+
+    Returns:
+        list: (X_train, y_train, X_test, y_test) numpy arrays per fold
+    """
+    if preprocessor is None:
+        preprocessor = make_preprocessor(imputation)
+    X, y = np.asarray(X, dtype=float), np.asarray(y)
+    preprocess = _preprocess_fold if memory is None else check_memory(memory).cache(_preprocess_fold)
+
+    return Parallel(n_jobs=n_jobs, max_nbytes='1M', mmap_mode='r')(
+        delayed(preprocess)(clone(preprocessor), X, y, train, test)
+        for train, test in folds)
+
+
+# Fit and score one pipeline (runs inside a worker)
+def _evaluate(name, model, X_train, y_train, X_test, y_test):
+    # plain ndarray views of the memory-mapped sets: np.memmap hashes differently, the pipeline
+    # would miss the preprocessing cached by `perfomance`
+    X_train, X_test = np.asarray(X_train), np.asarray(X_test)
+
+    # training time
+    t0 = time.time()
+    model.fit(X_train, y_train)
+    train_time = time.time() - t0
+
+    # predicting time
+    t0 = time.time()
+    preds = model.predict(X_test)
+    pred_time = time.time() - t0
+
+    # cross validation scores are computed on shared preprocessed folds, see `perfomance`
+
+    record = {'name': name,
+              # 'test_accuracy': accuracy_score(y_test, preds),
+              **_scores(y_test, preds),
+              'training_time': train_time,
+              'predicting_time': pred_time}
+
+    return record, model
+
+
+# Score a model on one preprocessed fold (runs inside a worker)
+def _score_fold(name, model, X_train, y_train, X_test, y_test):
+    model.fit(X_train, y_train)
+
+    return name, balanced_accuracy_score(y_test, model.predict(X_test))
+
+
+def _labels_array(y):
+    # object arrays (text labels) hash differently once pickled, fixed-width strings do not
+    y = np.asarray(y)
+    return y.astype(str) if y.dtype == object else y
+
+
 # Model performance
-def perfomance(pipes, X_train, y_train, X_test, y_test):
+def perfomance(pipes, X_train, y_train, X_test, y_test, n_jobs=-1, cv=None, groups=None):
     """Compute mean and std of cross validation scores, accuracy on test set
-       as well as training and predicting time
+       as well as training and predicting time. Pipelines are fitted in parallel worker
+       processes; arrays bigger than 1MB are memory-mapped instead of copied to each worker.
+       Fitted pipelines replace the unfitted ones in `pipes`.
+
+       With `cv`, the preprocessing of every fold is fitted once and shared by all the pipelines
+       with the same preprocessing steps (see `preprocess_folds`), then every (model, fold) pair
+       is fitted in parallel with the test set evaluation.
+
+       Pipelines with a `memory` (see `pipelines`) share their fitted preprocessing through it:
+       every distinct preprocessing is fitted on the training set once, before the workers start,
+       so they load it from the cache instead of refitting it concurrently. Their training_time
+       then covers the model and the cache load only. The sets are converted to C-ordered numpy
+       arrays (text labels to fixed-width strings) first: the hash of a DataFrame, of its
+       column-major values or of an object array, hence its cache key, changes once pickled to
+       a worker.
 
     Args: pipes(dict); as defined in `pipelines` function.
           X_train, y_train; training sets
           X_test, y_test; test sets
+          n_jobs(int); number of worker processes, -1 for all cores, 1 to run serially
+          cv(int); number of cross validation folds on the training set, None to skip cross validation
+          groups(array-like); user of every training row to keep each user in a single fold (see `user_kfold`), None for stratified folds
 
     Returns:
         Pandas Dataframe: Dataframe of computed performance metrics sorted by accuracy on test set
     """
-    results = pd.DataFrame()
-
-    for i in tqdm(range(len(pipes))):
-
-        name = list(pipes.keys())[i]
-        model = list(pipes.values())[i]
-
-        # training time
-        t0 = time.time()
-        model.fit(X_train, y_train)
-        train_time = time.time() - t0
-
-        # predicting time
-        t0 = time.time()
-        preds = model.predict(X_test)
-        pred_time = time.time() - t0
-
-        # cross validation
-        # scores = cross_val_score(model, X_train, y_train)
-
-        # append to results
-        results = pd.concat([results, pd.DataFrame({'name': [name],
-                                                    # 'mean_score': [scores.mean()],
-                                                    # 'std_score':[scores.std()],
-                                                    # 'test_accuracy': [accuracy_score(y_test, preds)],
-                                                    'balanced_accuracy':[balanced_accuracy_score(y_test, preds)],
-                                                    'f1_score': [f1_score(y_test, preds)],
-                                                    'precision': [precision_score(y_test, preds)],
-                                                    'recall': [recall_score(y_test, preds)],
-                                                    'training_time': [train_time],
-                                                    'predicting_time': [pred_time]})
-                             ])
+    records = [None] * len(pipes)
+    X_train, X_test = np.ascontiguousarray(X_train, dtype=float), np.ascontiguousarray(X_test, dtype=float)
+    y_train, y_test = _labels_array(y_train), _labels_array(y_test)
+
+    # fit every distinct cached preprocessing once, the workers then load it from `memory`
+    warmed = set()
+    for pipe in pipes.values():
+        preprocessor = clone(Pipeline(pipe.steps[:-1]))
+        key = joblib_hash(preprocessor)
+        if pipe.memory is not None and key not in warmed:
+            # same step names and count as `pipe`, so the cache entries are the ones its fit reads
+            Pipeline(preprocessor.steps + [(pipe.steps[-1][0], 'passthrough')],
+                     memory=pipe.memory).fit(X_train, y_train)
+            warmed.add(key)
+
+    # cross validation jobs: one per model and fold, on folds preprocessed once per preprocessing
+    cv_jobs = []
+    if cv is not None:
+        folds = make_folds(y_train, cv, groups)
+        fold_matrices = {}
+        for name, pipe in pipes.items():
+            preprocessor = clone(Pipeline(pipe.steps[:-1]))
+            key = joblib_hash(preprocessor)
+            if key not in fold_matrices:
+                fold_matrices[key] = preprocess_folds(X_train, y_train, folds, memory=pipe.memory,
+                                                      n_jobs=n_jobs, preprocessor=preprocessor)
+            cv_jobs += [delayed(_score_fold)(name, clone(pipe.steps[-1][1]), *fold)
+                        for fold in fold_matrices[key]]
+
+    outputs = Parallel(n_jobs=n_jobs, max_nbytes='1M', mmap_mode='r')(
+        [delayed(_evaluate)(name, model, X_train, y_train, X_test, y_test)
+         for name, model in pipes.items()] + cv_jobs)
+
+    fold_scores = {}
+    for name, score in outputs[len(pipes):]:
+        fold_scores.setdefault(name, []).append(score)
+
+    for i, (record, model) in enumerate(outputs[:len(pipes)]):
+        if cv is not None:
+            scores = np.array(fold_scores[record['name']])
+            record = {'name': record['name'], 'mean_score': scores.mean(), 'std_score': scores.std(), **record}
+        records[i] = record
+        pipes[record['name']] = model
+
+    results = pd.DataFrame.from_records(records, index=[0] * len(records))
 
     return results.sort_values(by='balanced_accuracy', ascending=False)
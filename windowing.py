@@ -0,0 +1,148 @@
+# Dependencies
+import pandas as pd
+import numpy as np
+
+
+# Statistics computed per sensor and window, in the order of the dataset columns
+STATISTICS = ('mean', 'min', 'max', 'std')
+
+# Sensors whose columns are not prefixed with android.sensor. in the datasets
+NON_ANDROID_SENSORS = {'sound', 'speed', 'activityrecognition'}
+
+
+def sensor_column_prefix(sensor):
+    """Column prefix of `sensor` in the datasets: 'accelerometer' -> 'android.sensor.accelerometer',
+    'sound' -> 'sound', names already prefixed are kept"""
+    if '.' in sensor or sensor in NON_ANDROID_SENSORS:
+        return sensor
+
+    return f'android.sensor.{sensor}'
+
+
+def window_features(events, window=5.0, overlap=0.0, time='time', sensor='sensor',
+                    values=('x', 'y', 'z'), start=None, ddof=1, drop_empty=True):
+    """Aggregate raw sensor events into windows with the column schema of the datasets
+    (`<sensor>#mean`, `#min`, `#max`, `#std`, sensors in the same order), so the result can go
+    through `select_columns` and be passed by position to models trained on the datasets.
+    Multi-axis readings are reduced to their magnitude first.
+
+    Events are sorted once by sensor and time, then cut into sub-windows of `window - overlap`
+    seconds with `searchsorted` and reduced with `np.ufunc.reduceat`; a window combines
+    `window / step` consecutive sub-windows. No Python loop runs over events or windows.
+
+    Args:
+        events (Pandas DataFrame): One row per sensor reading
+        window (float, optional): Window length in seconds. Defaults to 5.0.
+        overlap (float, optional): Fraction of a window shared with the next one, the window must be a multiple of the step `window * (1 - overlap)`, e.g. 0, 0.5 or 0.75. Defaults to 0.0.
+        time (str, optional): Column of the timestamps, in seconds or datetime. Defaults to 'time'.
+        sensor (str, optional): Column of the sensor names, e.g. 'accelerometer', 'sound'. Defaults to 'sensor'.
+        values (str or tuple of str, optional): Column(s) of the readings, the magnitude is used when there are several. Missing axes count as 0, so single-value sensors (sound, speed) can use the first column only. Defaults to ('x', 'y', 'z').
+        start (float or datetime, optional): Start of the first window. Defaults to the first event.
+        ddof (int, optional): Delta degrees of freedom of the standard deviation. Defaults to 1.
+        drop_empty (bool, optional): Drop windows without any event. Defaults to True.
+
+    Returns:
+        Pandas DataFrame: One row per window with its start `time` and 4 columns per sensor
+    """
+    if len(events) == 0:
+        raise ValueError('No event to aggregate')
+    if not 0 <= overlap < 1:
+        raise ValueError(f'overlap should be in [0, 1), got {overlap}')
+    step = window * (1 - overlap)
+    nb_steps = int(round(window / step))
+    if not np.isclose(nb_steps * step, window):
+        raise ValueError(f'window ({window}) should be a multiple of the step ({step})')
+
+    # timestamps in seconds
+    timestamps = events[time]
+    if pd.api.types.is_datetime64_any_dtype(timestamps):
+        origin = pd.Timestamp(start) if start is not None else timestamps.min()
+        t = (timestamps - origin).dt.total_seconds().to_numpy()
+        start = 0.0
+    else:
+        origin = None
+        t = timestamps.to_numpy(dtype=float)
+        start = np.nanmin(t) if start is None else float(start)
+
+    # readings, magnitude of multi-axis sensors
+    if isinstance(values, str):
+        x = events[values].to_numpy(dtype=float)
+    else:
+        axes = events.reindex(columns=list(values)).to_numpy(dtype=float)
+        observed = ~np.isnan(axes).all(axis=1)
+        x = np.where(observed, np.sqrt(np.nansum(axes ** 2, axis=1)), np.nan)
+
+    codes, sensors = pd.factorize(events[sensor], sort=True)
+    keep = ~np.isnan(x) & ~np.isnan(t) & (t >= start) & (codes >= 0)
+    codes, t, x = codes[keep], t[keep], x[keep]
+    nb_sensors = len(sensors)
+
+    # sub-window of every event, then sort by (sensor, sub-window)
+    sub = np.floor((t - start) / step).astype(np.int64)
+    nb_sub = int(sub.max()) + 1 if len(sub) else 0
+    key = codes.astype(np.int64) * nb_sub + sub
+    order = np.argsort(key, kind='stable')
+    key, x, codes = key[order], x[order], codes[order]
+
+    # center per sensor so sums of squares do not lose precision
+    centers = np.bincount(codes, weights=x, minlength=nb_sensors) / np.maximum(np.bincount(codes, minlength=nb_sensors), 1)
+    x = x - centers[codes]
+
+    # segment reductions over the sorted events, one segment per (sensor, sub-window);
+    # reduceat runs on the non-empty segments only so each one ends where the next begins
+    bounds = np.searchsorted(key, np.arange(nb_sensors * nb_sub + 1))
+    counts = np.diff(bounds)
+    filled = counts > 0
+    starts = bounds[:-1][filled]
+
+    sums, squares = np.zeros(len(counts)), np.zeros(len(counts))
+    mins, maxs = np.full(len(counts), np.inf), np.full(len(counts), -np.inf)
+    if len(starts):
+        sums[filled] = np.add.reduceat(x, starts)
+        squares[filled] = np.add.reduceat(x * x, starts)
+        mins[filled] = np.minimum.reduceat(x, starts)
+        maxs[filled] = np.maximum.reduceat(x, starts)
+
+    shape = (nb_sensors, nb_sub)
+    counts, sums, squares = counts.reshape(shape), sums.reshape(shape), squares.reshape(shape)
+    mins, maxs = mins.reshape(shape), maxs.reshape(shape)
+
+    # windows: `nb_steps` consecutive sub-windows
+    nb_windows = max(nb_sub - nb_steps + 1, 0) if nb_sub else 0
+    if nb_steps > 1 and nb_windows:
+        def rolling(a, reduce):
+            out = a[:, :nb_windows].copy()
+            for shift in range(1, nb_steps):
+                out = reduce(out, a[:, shift:shift + nb_windows])
+            return out
+
+        counts, sums, squares = (rolling(a, np.add) for a in (counts, sums, squares))
+        mins, maxs = rolling(mins, np.minimum), rolling(maxs, np.maximum)
+    else:
+        nb_windows = nb_sub
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+        variances = np.maximum(squares - counts * means ** 2, 0) / (counts - ddof)
+    variances = np.where(counts - ddof > 0, variances, np.nan)
+
+    stats = {'mean': means + centers[:, None],
+             'min': np.where(counts > 0, mins + centers[:, None], np.nan),
+             'max': np.where(counts > 0, maxs + centers[:, None], np.nan),
+             'std': np.sqrt(variances)}
+    stats = {name: np.where(counts > 0, values, np.nan) for name, values in stats.items()}
+
+    window_starts = start + np.arange(nb_windows) * step
+    data = {time: window_starts if origin is None else origin + pd.to_timedelta(window_starts, unit='s')}
+    # sensor blocks in the order of the dataset columns: android.sensor.* first, then sound and speed
+    prefixes = [sensor_column_prefix(str(name)) for name in sensors]
+    for i in sorted(range(nb_sensors), key=prefixes.__getitem__):
+        prefix = prefixes[i]
+        for stat in STATISTICS:
+            data[f'{prefix}#{stat}'] = stats[stat][i]
+
+    features = pd.DataFrame(data)
+    if drop_empty and nb_sensors:
+        features = features[(counts > 0).any(axis=0)].reset_index(drop=True)
+
+    return features